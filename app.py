@@ -1,4 +1,7 @@
+import asyncio
 import json
+import os
+import threading
 from datetime import timedelta
 import streamlit as st
 
@@ -41,6 +44,13 @@ if "all_years" not in st.session_state:
     st.session_state.all_years = False
 
 
+## How often cached papers are checked for new or updated rows.
+PAPERS_DELTA_INTERVAL = timedelta(minutes=5)
+## Local Arrow copy of the papers frame, memory-mapped on cold start.
+PAPERS_SNAPSHOT_PATH = os.environ.get(
+    "PAPERS_SNAPSHOT_PATH", os.path.join("data", "papers_snapshot.arrow")
+)
+
 collection_map = {
     "GTE-Large": "arxiv_vectors",
     "🆕 Cohere V3": "arxiv_vectors_cv3",
@@ -74,7 +84,8 @@ st.markdown(
 )
 
 
-def combine_input_data():
+def join_input_tables():
+    """Fallback: load each source table and join them in pandas."""
     arxiv_df = db.load_arxiv()
     summaries_df = db.load_summaries()
     topics_df = db.load_topics()
@@ -93,20 +104,38 @@ def combine_input_data():
     papers_df = papers_df.join(markdown_summaries, how="left")
     papers_df = papers_df.join(tweets, how="left")
     papers_df = papers_df.join(similar_docs_df, how="left")
+    return papers_df
+
 
+def add_paper_links(papers_df: pd.DataFrame) -> pd.DataFrame:
     papers_df["arxiv_code"] = papers_df.index
     papers_df["url"] = papers_df["arxiv_code"].map(
         lambda l: f"https://arxiv.org/abs/{l}"
     )
-    papers_df.sort_values("published", ascending=False, inplace=True)
     return papers_df
 
 
-@st.cache_data(ttl=timedelta(hours=6))
-def load_data():
-    """Load data from compiled dataframe."""
-    result_df = combine_input_data()
+def combine_input_data() -> Tuple[pd.DataFrame, dict]:
+    """Load the combined papers frame, with the table watermarks it reflects."""
+    try:
+        ## The view lags the base tables until its next refresh (z2), so deltas
+        ## are taken from the watermarks recorded at that refresh.
+        watermarks = db.get_papers_snapshot_watermarks()
+        papers_df = db.load_papers_snapshot()
+    except Exception as e:
+        print(f"Papers snapshot unavailable, joining tables instead: {e}")
+        ## Watermarks go first so rows written during the load are re-fetched.
+        watermarks = db.get_table_watermarks()
+        watermarks[db.PAPERS_SNAPSHOT_VIEW] = db.get_papers_snapshot_refreshed_at()
+        papers_df = join_input_tables()
+
+    papers_df = add_paper_links(papers_df)
+    papers_df.sort_values("published", ascending=False, inplace=True)
+    return papers_df, watermarks
+
 
+def format_papers_df(result_df: pd.DataFrame) -> pd.DataFrame:
+    """Apply display formatting to a combined papers frame."""
     ## Remapping with emotion.
     classification_map = {
         "TRAINING": "🏋️‍ TRAINING",
@@ -130,6 +159,139 @@ def load_data():
     return result_df
 
 
+def refresh_papers_delta(
+    papers_df: pd.DataFrame, watermarks: dict
+) -> Tuple[pd.DataFrame, dict]:
+    """Upsert papers with rows newer than the watermarks into the papers frame.
+    Reloads the whole frame when the papers view has been refreshed since, as
+    tables without a `tstp` (details, topics, similar docs) only change there."""
+    refreshed_at = db.get_papers_snapshot_refreshed_at()
+    loaded_at = watermarks.get(db.PAPERS_SNAPSHOT_VIEW)
+    if refreshed_at is not None and (loaded_at is None or refreshed_at > loaded_at):
+        papers_df, new_watermarks = combine_input_data()
+        return format_papers_df(papers_df), new_watermarks
+
+    new_watermarks = db.get_table_watermarks()
+    changed_codes = set()
+    if any(new_watermarks[t] != watermarks.get(t) for t in db.papers_delta_tables):
+        changed_codes = set(db.get_changed_arxiv_codes(watermarks))
+    new_watermarks[db.PAPERS_SNAPSHOT_VIEW] = loaded_at
+    ## Topics are assigned after summaries and carry no tstp; reload papers
+    ## only once their topic lands.
+    missing_topic_codes = papers_df.index[papers_df["topic"].isna()]
+    if len(missing_topic_codes):
+        changed_codes |= set(db.get_codes_with_topics(list(missing_topic_codes)))
+    if len(changed_codes) == 0:
+        return papers_df, new_watermarks
+
+    delta_df = db.load_papers_by_code(list(changed_codes))
+    delta_df = format_papers_df(add_paper_links(delta_df))
+    papers_df = pd.concat([papers_df.drop(delta_df.index, errors="ignore"), delta_df])
+    papers_df.sort_values("published", ascending=False, inplace=True)
+    return papers_df, new_watermarks
+
+
+@st.cache_resource
+def get_papers_cache() -> dict:
+    """Process-wide papers frame shared by all sessions, with its table watermarks."""
+    return {
+        "papers": None,
+        "watermarks": {},
+        "checked": None,
+        "refreshing": False,
+        "lock": threading.Lock(),
+    }
+
+
+def save_papers_snapshot(papers_df: pd.DataFrame, watermarks: dict):
+    try:
+        au.save_papers_snapshot(papers_df, watermarks, PAPERS_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"Could not write local papers snapshot: {e}")
+
+
+def reconcile_papers_cache(cache: dict):
+    """Bring the cached papers frame up to date with the DB (runs in background)."""
+    papers_df, watermarks = cache["papers"], cache["watermarks"]
+    try:
+        new_papers_df, new_watermarks = refresh_papers_delta(papers_df, watermarks)
+    except Exception as e:
+        print(f"Delta refresh failed, serving cached papers: {e}")
+        new_papers_df, new_watermarks = papers_df, watermarks
+
+    with cache["lock"]:
+        cache["papers"], cache["watermarks"] = new_papers_df, new_watermarks
+        cache["checked"] = pd.Timestamp.now()
+        cache["refreshing"] = False
+
+    if new_papers_df is not papers_df:
+        save_papers_snapshot(new_papers_df, new_watermarks)
+
+
+def load_data():
+    """Load data from compiled dataframe. Cold starts read the local snapshot
+    (or the DB if there is none); afterwards the frame is reconciled with the
+    DB incrementally in a background thread."""
+    cache = get_papers_cache()
+    with cache["lock"]:
+        if cache["papers"] is None:
+            papers_df, watermarks = au.load_papers_snapshot(PAPERS_SNAPSHOT_PATH)
+            if papers_df is None:
+                papers_df, watermarks = combine_input_data()
+                papers_df = format_papers_df(papers_df)
+                cache["checked"] = pd.Timestamp.now()
+                threading.Thread(
+                    target=save_papers_snapshot,
+                    args=(papers_df, watermarks),
+                    daemon=True,
+                ).start()
+            cache["papers"], cache["watermarks"] = papers_df, watermarks
+
+        stale = (
+            cache["checked"] is None
+            or pd.Timestamp.now() - cache["checked"] > PAPERS_DELTA_INTERVAL
+        )
+        if stale and not cache["refreshing"]:
+            cache["refreshing"] = True
+            threading.Thread(
+                target=reconcile_papers_cache, args=(cache,), daemon=True
+            ).start()
+        return cache["papers"]
+
+
+@st.cache_resource
+def warm_answer_cache():
+    """Seed the chat answer cache from recent Q&A logs (once per process)."""
+
+    def _warm():
+        try:
+            au.answer_cache.warm_from_logs()
+        except Exception as e:
+            print(f"Could not warm answer cache: {e}")
+
+    threading.Thread(target=_warm, daemon=True).start()
+    return True
+
+
+@st.cache_resource
+def warm_retrievers():
+    """Build the legacy chat retrievers of all collections (once per process)."""
+    threading.Thread(
+        target=au.retriever_registry.warmup,
+        args=(list(collection_map.values()),),
+        daemon=True,
+    ).start()
+    return True
+
+
+@st.cache_resource
+def warm_vector_index():
+    """Build the chat ANN index in the background (once per process)."""
+    if au.USE_LOCAL_VECTOR_INDEX:
+        au.warm_local_index()
+    return True
+
+
 @st.cache_data
 def load_repositories(year: int, filter_by_year=True):
     repos_df = db.load_repositories()
@@ -231,6 +393,9 @@ def main():
 
     ## Main content.
     full_papers_df = load_data()
+    warm_answer_cache()
+    warm_retrievers()
+    warm_vector_index()
     papers_df, year = su.create_sidebar(full_papers_df)
 
     filter_by_year = not st.session_state.all_years
@@ -364,36 +529,93 @@ def main():
         #     label_visibility="collapsed",
         # )
         response_length = "Short Answer"
+        fallback_response = (
+            "Sorry, the GPT maestro is taking too long to respond. Please try again."
+        )
         if chat_btn:
             if user_question != "":
+                record_response = True
                 with st.spinner(
                     "Consulting the GPT maestro, this might take a minute..."
                 ):
-                    response, referenced_codes, relevant_codes = au.query_llmpedia_new(
-                        user_question,
-                        response_length,
-                    )
-                    db.log_qna_db(user_question, response)
-                    st.divider()
-                    st.markdown(response)
-                    if len(referenced_codes) > 0:
-                        st.divider()
-                        st.markdown(
-                            "<h4>Referenced Papers:</h4>", unsafe_allow_html=True
+                    try:
+                        cached_answer = au.answer_cache.lookup(
+                            user_question, response_length
+                        )
+                    except Exception as e:
+                        print(f"Answer cache lookup failed: {e}")
+                        cached_answer = None
+                    try:
+                        if cached_answer is not None:
+                            response, referenced_codes, relevant_codes = cached_answer
+                            db.log_qna_db(user_question, response)
+                            record_response = False
+                        else:
+                            response, referenced_codes, relevant_codes, _ = asyncio.run(
+                                au.aquery_llmpedia_new(
+                                    user_question, response_length, stream=True
+                                )
+                            )
+                    except TimeoutError as e:
+                        print(e)
+                        response, referenced_codes, relevant_codes = (
+                            fallback_response,
+                            [],
+                            [],
                         )
-                        reference_df = st.session_state["papers"].loc[referenced_codes]
-                        su.generate_grid_gallery(
-                            reference_df, n_cols=5, extra_key="_chat"
+                        record_response = False
+                    except Exception as e:
+                        print(f"Chat query failed: {e}")
+                        db.log_error_db(e)
+                        response, referenced_codes, relevant_codes = (
+                            fallback_response,
+                            [],
+                            [],
                         )
-                    if len(relevant_codes) > 0:
-                        st.divider()
-                        st.markdown(
-                            "<h4>Other Relevant Papers:</h4>", unsafe_allow_html=True
+                        record_response = False
+                st.divider()
+                if isinstance(response, str):
+                    st.markdown(response)
+                else:
+                    answer_container = st.empty()
+                    try:
+                        with answer_container:
+                            streamed_response = st.write_stream(response)
+                        response, referenced_codes, relevant_codes = (
+                            au.format_answer_references(
+                                streamed_response, relevant_codes
+                            )
                         )
-                        relevant_df = st.session_state["papers"].loc[relevant_codes]
-                        su.generate_grid_gallery(
-                            relevant_df, n_cols=5, extra_key="_chat"
+                    except Exception as e:
+                        print(f"Chat answer stream failed: {e}")
+                        db.log_error_db(e)
+                        response, referenced_codes, relevant_codes = (
+                            fallback_response,
+                            [],
+                            [],
                         )
+                        record_response = False
+                    answer_container.markdown(response)
+                if record_response:
+                    au.record_answer(
+                        user_question,
+                        response,
+                        referenced_codes,
+                        relevant_codes,
+                        response_length,
+                    )
+                if len(referenced_codes) > 0:
+                    st.divider()
+                    st.markdown("<h4>Referenced Papers:</h4>", unsafe_allow_html=True)
+                    reference_df = st.session_state["papers"].loc[referenced_codes]
+                    su.generate_grid_gallery(reference_df, n_cols=5, extra_key="_chat")
+                if len(relevant_codes) > 0:
+                    st.divider()
+                    st.markdown(
+                        "<h4>Other Relevant Papers:</h4>", unsafe_allow_html=True
+                    )
+                    relevant_df = st.session_state["papers"].loc[relevant_codes]
+                    su.generate_grid_gallery(relevant_df, n_cols=5, extra_key="_chat")
 
     with content_tabs[4]:
         ## Repositories.
@@ -0,0 +1,37 @@
+import os, sys
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+
+import utils.db as db
+
+## Tables probed by the workflow's pending-work anti-joins.
+table_names = [
+    "arxiv_details",
+    "arxiv_chunks",
+    "arxiv_large_parent_chunks",
+    "arxiv_chunk_map",
+    "arxiv_dashboards",
+    "arxiv_repos",
+    "bullet_list_summaries",
+    "recursive_summaries",
+    "semantic_details",
+    "summaries",
+    "summary_markdown",
+    "summary_notes",
+    "topics",
+    "tweet_reviews",
+]
+
+
+def main():
+    """Create the arxiv_code indexes used to find pending work, and the
+    full-text indexes used by hybrid chat search."""
+    db.create_arxiv_code_indexes(table_names)
+    db.create_lexical_search_indexes()
+    print("Done!")
+
+
+if __name__ == "__main__":
+    main()
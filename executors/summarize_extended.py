@@ -6,7 +6,6 @@ load_dotenv()
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.callbacks import get_openai_callback
-from tqdm import tqdm
 
 sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
@@ -14,32 +13,32 @@ os.chdir(os.environ.get("PROJECT_PATH"))
 import utils.vector_store as vs
 import utils.paper_utils as pu
 import utils.db as db
+from utils.concurrency import run_concurrent
 
 
 def main():
     vs.validate_openai_env()
     title_map = db.get_arxiv_title_dict(db.db_params)
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
-    done_codes = db.get_arxiv_id_list(db.db_params, "summary_markdown")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    arxiv_codes = list(
+        db.pending_codes("summary_notes", "summary_markdown", order="desc")
+    )
+    notes_map = db.get_extended_notes_batch(arxiv_codes, expected_tokens=3000)
     # arxiv_codes = ["2404.05961"]
 
-    for arxiv_code in tqdm(arxiv_codes):
-        paper_notes = db.get_extended_notes(
-            arxiv_code=arxiv_code, expected_tokens=3000
-        )
+    def convert_to_markdown(arxiv_code):
+        paper_notes = notes_map[arxiv_code]
         paper_title = title_map[arxiv_code]
 
-        ## Convert notes to Markdown format and store.
+        ## Convert notes to Markdown format.
         # markdown_notes = vs.convert_notes_to_markdown(paper_title, paper_notes, model="GPT-4-Turbo")
         notes_org = vs.organize_notes(
             paper_title, paper_notes, model="claude-sonnet"
         )
-
-        markdown_notes = vs.convert_notes_to_markdown(
+        return vs.convert_notes_to_markdown(
             paper_title, notes_org, model="claude-sonnet"
         )
+
+    def store(arxiv_code, markdown_notes):
         markdown_df = pd.DataFrame(
             {
                 "arxiv_code": [arxiv_code],
@@ -49,6 +48,7 @@ def main():
         )
         db.upload_df_to_db(markdown_df, "summary_markdown", db.db_params)
 
+    run_concurrent(arxiv_codes, convert_to_markdown, store, desc="Markdown notes")
     print("Done!")
 
 
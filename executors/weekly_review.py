@@ -14,6 +14,8 @@ os.chdir(os.environ.get("PROJECT_PATH"))
 import utils.paper_utils as pu
 import utils.vector_store as vs
 import utils.db as db
+from utils.concurrency import DeferredJob
+from utils.batch import run_stage_in_batches
 
 summaries_path = os.path.join(os.environ.get("PROJECT_PATH"), "data", "summaries")
 meta_path = os.path.join(os.environ.get("PROJECT_PATH"), "data", "arxiv_meta")
@@ -36,15 +38,19 @@ def main(date_str: str):
         date_st - pd.Timedelta(days=7 * 8), date_st, freq="W-MON"
     )
     prev_mondays = [date.strftime("%Y-%m-%d") for date in prev_mondays]
+    counts_df = db.get_weekly_counts(prev_mondays[0], date_str)
+    counts_map = counts_df.set_index("week_start")["paper_count"]
     weekly_counts = {
-        date_str: len(db.get_weekly_summary_inputs(date_str))
-        for date_str in prev_mondays
+        monday_str: int(counts_map.get(pd.to_datetime(monday_str), 0))
+        for monday_str in prev_mondays
     }
 
     ## ToDo: Remove this block.
     ## -------------------------
     try:
-        previous_summary = db.get_weekly_content(prev_mondays[-2], content_type="content")
+        previous_summary = db.get_weekly_content(
+            prev_mondays[-2], content_type="content"
+        )
         previous_themes = previous_summary.split("\n")[0]
     except:
         previous_summary = db.get_weekly_summary_old(prev_mondays[-2])
@@ -88,9 +94,22 @@ def main(date_str: str):
     weekly_content_md += f"## Last Week's Submissions for New Developments and Themes\nBelow is the introduction you published last week.\n"
     weekly_content_md += f"```{previous_themes}```"
 
-    ## Generate summary.
-    weekly_summary_obj = vs.generate_weekly_report(weekly_content_md, model="gpt-4o")
-    weekly_highlight = vs.generate_weekly_highlight(weekly_content_md, model="gpt-4o")
+    ## Generate summary (in batch mode both prompts are spooled in one round).
+    deferred = False
+    try:
+        weekly_summary_obj = vs.generate_weekly_report(
+            weekly_content_md, model="gpt-4o"
+        )
+    except DeferredJob:
+        deferred = True
+    try:
+        weekly_highlight = vs.generate_weekly_highlight(
+            weekly_content_md, model="gpt-4o"
+        )
+    except DeferredJob:
+        deferred = True
+    if deferred:
+        raise DeferredJob()
 
     ## Format content.
     date = pd.to_datetime(date_str)
@@ -128,6 +147,19 @@ if __name__ == "__main__":
 
     date_range = pd.date_range(start_dt, end_dt, freq="W-MON")
     date_range = [date.strftime("%Y-%m-%d") for date in date_range]
-    for date_str in tqdm(date_range):
-        main(date_str)
-        time.sleep(5)
+
+    def run_weeks():
+        for date_str in tqdm(date_range):
+            try:
+                main(date_str)
+            except DeferredJob:
+                ## Later weeks quote this week's themes in their prompt, so they
+                ## are only spooled once this week is stored (next round).
+                break
+            time.sleep(5)
+
+    ## `--batch` runs the backfill through the offline batch provider.
+    if "--batch" in sys.argv:
+        run_stage_in_batches(run_weeks, "weekly_review")
+    else:
+        run_weeks()
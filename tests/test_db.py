@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for key in ("DB_NAME", "DB_USER", "DB_PASS", "DB_HOST", "DB_PORT"):
+    os.environ.setdefault(key, "test")
+
+import utils.db as db
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ["2401.00001", "2401.00002"],
+        [],
+        ["with space", 'with "quote"', "back\\slash", "a,b", "{braces}"],
+        ["", "NULL", None],
+    ],
+)
+def test_copy_array_literal_round_trip(values):
+    literal = db._to_copy_value(values)
+    assert db.pg_array_to_list(literal) == values
+
+
+def test_copy_array_literal_matches_postgres_output():
+    ## Codes must come back unquoted, as `to_sql` stored them before COPY.
+    assert db._to_copy_value(["2401.00001", "2401.00002"]) == "{2401.00001,2401.00002}"
+
+
+def test_pg_array_to_list_reads_postgres_output():
+    assert db.pg_array_to_list("{2401.00001,2401.00002}") == [
+        "2401.00001",
+        "2401.00002",
+    ]
+    assert db.pg_array_to_list('{"a b",NULL,"x\\"y"}') == ["a b", None, 'x"y']
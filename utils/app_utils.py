@@ -1,11 +1,26 @@
 from pydantic import BaseModel
+from abc import ABC, abstractmethod
 from typing import List, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+import pyarrow.feather as feather
+import pyarrow as pa
 import pandas as pd
 import numpy as np
 import datetime
 import json
+import threading
+import asyncio
+import time
+import sqlite3
+import hashlib
 import os, re
 
+from sqlalchemy.engine import Engine
+import sqlalchemy
+from sqlalchemy.exc import InterfaceError, OperationalError, SQLAlchemyError
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import CohereRerank
 from langchain_community.embeddings.huggingface import HuggingFaceEmbeddings
@@ -19,6 +34,7 @@ from utils.models import llm_map
 from utils.instruct import run_instructor_query
 import utils.prompts as ps
 import utils.db as db
+import utils.vector_index as vi
 
 CONNECTION_STRING = (
     f"postgresql+psycopg2://{db.db_params['user']}:{db.db_params['password']}"
@@ -147,13 +163,59 @@ def numbered_to_bullet_list(list_str: str):
     return list_str
 
 
+####################
+## LOCAL SNAPSHOT ##
+####################
+
+WATERMARKS_METADATA_KEY = b"llmpedia_watermarks"
+
+
+def save_papers_snapshot(papers_df: pd.DataFrame, watermarks: dict, path: str):
+    """Write the papers frame (and its DB watermarks) to an uncompressed Arrow
+    file that can be memory-mapped on the next cold start."""
+    table = pa.Table.from_pandas(papers_df, preserve_index=True)
+    watermarks_json = json.dumps(
+        {k: (str(v) if v is not None else None) for k, v in watermarks.items()}
+    )
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), WATERMARKS_METADATA_KEY: watermarks_json}
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return True
+
+
+def load_papers_snapshot(path: str) -> Tuple[pd.DataFrame, dict]:
+    """Memory-map a local papers snapshot; returns (None, {}) if unavailable."""
+    if not os.path.exists(path):
+        return None, {}
+    try:
+        table = feather.read_table(path, memory_map=True)
+        watermarks = json.loads(table.schema.metadata[WATERMARKS_METADATA_KEY])
+        papers_df = table.to_pandas()
+    except Exception as e:
+        print(f"Could not read local papers snapshot: {e}")
+        return None, {}
+
+    watermarks = {
+        k: (pd.Timestamp(v).to_pydatetime() if v is not None else None)
+        for k, v in watermarks.items()
+    }
+    papers_df["similar_docs"] = papers_df["similar_docs"].apply(
+        lambda x: list(x) if x is not None else np.nan
+    )
+    return papers_df, watermarks
+
+
 ##################
 ## VECTOR STORE ##
 ##################
 
 
-def initialize_retriever(collection_name):
-    """Initialize retriever for GPT maestro."""
+def build_retriever(collection_name):
+    """Build the compression retriever for GPT maestro."""
     if collection_name == "arxiv_vectors_cv3":
         embeddings = NewCohereEmbeddings(
             cohere_api_key=os.getenv("COHERE_API_KEY"), model="embed-english-v3.0"
@@ -169,6 +231,7 @@ def initialize_retriever(collection_name):
         collection_name=collection_name,
         connection_string=CONNECTION_STRING,
         embedding_function=embeddings,
+        engine_args={"pool_pre_ping": True},
     )
     retriever = store.as_retriever(search_type="similarity", search_kwargs={"k": 20})
 
@@ -181,6 +244,85 @@ def initialize_retriever(collection_name):
     return compression_retriever
 
 
+class RetrieverRegistry:
+    """One compression retriever per collection per process. Retrievers are
+    built lazily on first use (or ahead of time with `warmup`). Every
+    `health_interval` seconds a used retriever's own DB connection is checked
+    with a round trip, and the retriever is rebuilt if the check fails."""
+
+    def __init__(self, health_interval: int = 300):
+        self.health_interval = health_interval
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _collection_lock(self, collection_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(collection_name, threading.Lock())
+
+    @staticmethod
+    def _is_healthy(collection_name: str, retriever) -> bool:
+        """Run `SELECT 1` through the vector store's own engine or connection."""
+        store = retriever.base_retriever.vectorstore
+        bind = getattr(store, "_bind", None) or getattr(store, "_conn", None)
+        if bind is None:
+            ## Nothing to probe; pooled connections are pre-pinged on checkout.
+            return True
+        try:
+            if isinstance(bind, Engine):
+                with bind.connect() as conn:
+                    conn.execute(sqlalchemy.text("SELECT 1"))
+            else:
+                bind.execute(sqlalchemy.text("SELECT 1"))
+            return True
+        except SQLAlchemyError as e:
+            print(f"Retriever health check failed for '{collection_name}': {e}")
+            return False
+
+    def get(self, collection_name: str):
+        with self._collection_lock(collection_name):
+            entry = self._entries.get(collection_name)
+            now = time.monotonic()
+            if entry is not None and now - entry["checked"] >= self.health_interval:
+                if self._is_healthy(collection_name, entry["retriever"]):
+                    entry["checked"] = now
+                else:
+                    entry = None
+            if entry is None:
+                entry = {"retriever": build_retriever(collection_name), "checked": now}
+                self._entries[collection_name] = entry
+            return entry["retriever"]
+
+    def invalidate(self, collection_name: str):
+        """Drop a retriever so the next use rebuilds it."""
+        with self._collection_lock(collection_name):
+            self._entries.pop(collection_name, None)
+
+    def warmup(self, collection_names: list):
+        """Build the retrievers of several collections ahead of first use."""
+        for collection_name in collection_names:
+            try:
+                self.get(collection_name)
+            except Exception as e:
+                print(f"Could not warm retriever '{collection_name}': {e}")
+
+    def stats(self) -> dict:
+        """Seconds since each cached retriever was last checked."""
+        now = time.monotonic()
+        return {
+            name: round(now - entry["checked"], 1)
+            for name, entry in list(self._entries.items())
+        }
+
+
+retriever_registry = RetrieverRegistry()
+
+
+def initialize_retriever(collection_name):
+    """Get the (process-wide) retriever for GPT maestro."""
+    return retriever_registry.get(collection_name)
+
+
 def create_rag_context(parent_docs: pd.DataFrame) -> str:
     """Create RAG context for LLM, including text excerpts, arxiv_codes,
     year of publication and citation counts."""
@@ -227,13 +369,19 @@ def query_llmpedia(question: str, collection_name: str, model: str = "GPT-3.5-Tu
     queries_list = json.loads(queries)
     all_parent_docs = []
     for query in queries_list:
-        child_docs = compression_retriever.invoke(query)
+        try:
+            child_docs = compression_retriever.invoke(query)
+        except (OperationalError, InterfaceError) as e:
+            ## Stale DB connection; rebuild the retriever once and retry.
+            print(f"Retriever failed ({e}), rebuilding...")
+            retriever_registry.invalidate(collection_name)
+            compression_retriever = initialize_retriever(collection_name)
+            child_docs = compression_retriever.invoke(query)
 
         ## Map to parent chunk (for longer context).
         child_docs = [doc.metadata for doc in child_docs]
         child_ids = [(doc["arxiv_code"], doc["chunk_id"]) for doc in child_docs]
-        parent_ids = db.get_arxiv_parent_chunk_ids(child_ids)
-        parent_docs = db.get_arxiv_chunks(parent_ids, source="parent")
+        parent_docs = db.get_arxiv_parent_chunks(child_ids, version="10000_1000")
         if len(parent_docs) == 0:
             continue
         parent_docs["published"] = pd.to_datetime(parent_docs["published"]).dt.year
@@ -262,6 +410,346 @@ def query_llmpedia(question: str, collection_name: str, model: str = "GPT-3.5-Tu
     return content
 
 
+######################
+## QUERY EMBEDDINGS ##
+######################
+
+QUERY_EMBEDDINGS_CACHE_PATH = os.getenv(
+    "QUERY_EMBEDDINGS_CACHE_PATH", "data/query_embeddings.sqlite"
+)
+
+
+class QueryEmbedder:
+    """Process-wide query embedding service. Keeps one embeddings client per
+    model, and caches vectors keyed by (model, whitespace-normalized text) in an
+    in-memory LRU backed by a persistent SQLite file. Case is preserved, since
+    terms like "GPT-4" or "LoRA" embed differently from their lowercase forms."""
+
+    def __init__(self, cache_path: str = None, max_items: int = 2048):
+        self.cache_path = cache_path
+        self.max_items = max_items
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip()
+
+    @staticmethod
+    def _cache_key(model_name: str, query: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{query}".encode("utf-8")).hexdigest()
+
+    def _get_model(self, model_name: str):
+        ## Separate lock, so building a client does not block cache hits.
+        with self._models_lock:
+            if model_name not in self._models:
+                if "embed-english" in model_name:
+                    self._models[model_name] = CohereEmbeddings(
+                        cohere_api_key=os.getenv("COHERE_API_KEY"), model=model_name
+                    )
+                else:
+                    self._models[model_name] = HuggingFaceEmbeddings(
+                        model_name=model_name
+                    )
+            return self._models[model_name]
+
+    def _get_conn(self):
+        """Open (and initialize) the on-disk cache; None if disabled."""
+        if self.cache_path is None:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    query TEXT,
+                    vector BLOB
+                );
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _disk_get(self, key: str):
+        try:
+            conn = self._get_conn()
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT vector FROM query_embeddings WHERE key = ?;", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Query embeddings cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def _disk_put(self, key: str, model_name: str, query: str, vector: list):
+        try:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?);",
+                (key, model_name, query, np.asarray(vector, np.float32).tobytes()),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Query embeddings cache write failed: {e}")
+
+    def _remember(self, key: str, vector: list):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def embed(self, query: str, model_name: str) -> list:
+        """Embed a search query, serving repeats from cache."""
+        key = self._cache_key(model_name, self.normalize(query))
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+            vector = self._disk_get(key)
+            if vector is not None:
+                self._stats["disk_hits"] += 1
+                self._remember(key, vector)
+                return vector
+
+        vector = self._get_model(model_name).embed_query(query)
+        with self._lock:
+            self._stats["misses"] += 1
+            self._remember(key, vector)
+            self._disk_put(key, model_name, self.normalize(query), vector)
+        return vector
+
+    def stats(self) -> dict:
+        """Cache hit counters and overall hit rate."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        total = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["memory_hits"] + stats["disk_hits"]) / total if total else 0.0
+        )
+        return stats
+
+
+query_embedder = QueryEmbedder(cache_path=QUERY_EMBEDDINGS_CACHE_PATH)
+
+
+def get_query_embedding_stats() -> dict:
+    return query_embedder.stats()
+
+
+##################
+## ANSWER CACHE ##
+##################
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 60 * 60)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+## Answers given when retrieval finds nothing usable (never cached).
+NO_ANSWER_RESPONSE = "Sorry, I don't know about that."
+FALLBACK_RESPONSES = {NO_ANSWER_RESPONSE, "No results found."}
+
+
+def is_cacheable_answer(
+    response: str, referenced_codes: List[str] = None, relevant_codes: List[str] = None
+) -> bool:
+    """Only answers grounded on papers are reused; fallbacks and empty
+    retrievals could go stale as soon as new papers are added."""
+    if not response or response.strip() in FALLBACK_RESPONSES:
+        return False
+    return bool(referenced_codes or relevant_codes)
+
+
+class AnswerCache:
+    """Semantic cache of chat answers. A question hits when its embedding is
+    within `threshold` cosine similarity of a cached question asked with the
+    same response length. Entries expire after `ttl` seconds or when the
+    corpus version (the papers tables' watermarks, checked at most every
+    `version_interval` seconds) changes. Evicts least-frequently, then
+    least-recently, used entries beyond `max_entries`."""
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: int = ANSWER_CACHE_TTL,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        version_interval: int = 300,
+        model_name: str = "embed-english-v3.0",
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_interval = version_interval
+        self.model_name = model_name
+        self._entries = []
+        self._version = None
+        self._last_version_check = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "expired": 0, "evicted": 0}
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(
+            convert_query_to_vector(question, self.model_name), dtype=np.float32
+        )
+        return vector / max(np.linalg.norm(vector), 1e-12)
+
+    def _corpus_version(self) -> str:
+        now = time.monotonic()
+        if self._version is None or now - self._last_version_check >= (
+            self.version_interval
+        ):
+            watermarks = db.get_table_watermarks(db.papers_delta_tables)
+            self._version = json.dumps(
+                {k: str(v) for k, v in sorted(watermarks.items())}
+            )
+            self._last_version_check = now
+        return self._version
+
+    def _purge(self, version: str):
+        now = time.time()
+        live = [
+            e
+            for e in self._entries
+            if e["version"] == version and now - e["created"] < self.ttl
+        ]
+        self._stats["expired"] += len(self._entries) - len(live)
+        self._entries = live
+
+    def _evict(self):
+        overflow = len(self._entries) - self.max_entries
+        if overflow <= 0:
+            return
+        self._entries.sort(key=lambda e: (e["hits"], e["last_used"]))
+        self._entries = self._entries[overflow:]
+        self._stats["evicted"] += overflow
+
+    def lookup(
+        self, question: str, response_length: str = "Normal"
+    ) -> Tuple[str, List[str], List[str]]:
+        """Return (response, referenced_codes, relevant_codes) of the closest
+        cached question, or None on a miss."""
+        vector = self._embed(question)
+        version = self._corpus_version()
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._purge(version)
+            candidates = [
+                e
+                for e in self._entries
+                if e["response_length"] in (None, response_length)
+            ]
+            if not candidates:
+                return None
+            similarities = np.vstack([e["vector"] for e in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            entry = candidates[best]
+            entry["hits"] += 1
+            entry["last_used"] = time.time()
+            self._stats["hits"] += 1
+            return (
+                entry["response"],
+                list(entry["referenced_codes"]),
+                list(entry["relevant_codes"]),
+            )
+
+    def add(
+        self,
+        question: str,
+        response: str,
+        referenced_codes: List[str] = None,
+        relevant_codes: List[str] = None,
+        response_length: str = "Normal",
+        created: float = None,
+    ):
+        """Cache an answer; ungrounded or fallback answers are skipped."""
+        if not is_cacheable_answer(response, referenced_codes, relevant_codes):
+            return
+        vector = self._embed(question)
+        version = self._corpus_version()
+        now = time.time()
+        with self._lock:
+            self._entries.append(
+                {
+                    "question": question,
+                    "vector": vector,
+                    "response": response,
+                    "referenced_codes": referenced_codes or [],
+                    "relevant_codes": relevant_codes or [],
+                    "response_length": response_length,
+                    "version": version,
+                    "created": created or now,
+                    "hits": 0,
+                    "last_used": now,
+                }
+            )
+            self._evict()
+
+    def warm_from_logs(self, limit: int = 100):
+        """Seed the cache with recent Q&A logs (logs carry neither the response
+        length nor the unreferenced sources, so those entries match any length
+        and return only the codes cited in the response)."""
+        qna_df = db.get_recent_qna_logs(limit)
+        cutoff = pd.to_datetime("now") - pd.Timedelta(seconds=self.ttl)
+        qna_df = qna_df[pd.to_datetime(qna_df["tstp"]) >= cutoff]
+        for _, row in qna_df.iloc[::-1].iterrows():
+            self.add(
+                row["user_question"],
+                row["response"],
+                referenced_codes=extract_arxiv_codes(row["response"]),
+                response_length=None,
+                created=pd.Timestamp(row["tstp"]).timestamp(),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_ratio"] = (
+            stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        )
+        return stats
+
+
+answer_cache = AnswerCache()
+
+
+def record_answer(
+    user_question: str,
+    response: str,
+    referenced_codes: List[str],
+    relevant_codes: List[str],
+    response_length: str = "Normal",
+):
+    """Log a chat answer to the DB and add it to the answer cache."""
+    db.log_qna_db(user_question, response)
+    try:
+        answer_cache.add(
+            user_question,
+            response,
+            referenced_codes,
+            relevant_codes,
+            response_length=response_length,
+        )
+    except Exception as e:
+        print(f"Could not cache chat answer: {e}")
+
+
 ######################
 ## VECTOR STORE NEW ##
 ######################
@@ -279,26 +767,51 @@ class Document(BaseModel):
 
 query_config_json = """
 {
-  "title": "LOWER(a.title) LIKE LOWER('%%%s%%')",
-  "min_publication_date": "a.published >= '%s'",
-  "max_publication_date": "a.published <= '%s'",
-  "topic_categories": "t.topic IN ('%s')",
-  "min_citations": "s.citation_count > %d",
-  "semantic_search_queries": "(%s)"
+  "title": "LOWER(a.title) LIKE LOWER(%(title)s)",
+  "min_publication_date": "a.published >= %(min_publication_date)s",
+  "max_publication_date": "a.published <= %(max_publication_date)s",
+  "topic_categories": "t.topic = ANY(%(topic_categories)s)",
+  "min_citations": "s.citation_count > %(min_citations)s"
 }
 """
 
 query_config = json.loads(query_config_json)
 
 
-def interrogate_paper(question: str, arxiv_code: str) -> str:
-    """Ask a question about a paper."""
+def strip_stream_tags(stream, tags=("<response>", "</response>")):
+    """Remove wrapper tags from a stream of text chunks, holding back any
+    trailing text that could be the start of a tag split across chunks."""
+    buffer = ""
+    for chunk in stream:
+        buffer += chunk
+        for tag in tags:
+            buffer = buffer.replace(tag, "")
+        cut = buffer.rfind("<")
+        if cut != -1 and any(tag.startswith(buffer[cut:]) for tag in tags):
+            text, buffer = buffer[:cut], buffer[cut:]
+        else:
+            text, buffer = buffer, ""
+        if text:
+            yield text
+    if buffer:
+        yield buffer
+
+
+def interrogate_paper(question: str, arxiv_code: str, stream: bool = False):
+    """Ask a question about a paper (optionally streaming the response)."""
     context = db.get_extended_notes(arxiv_code, expected_tokens=8000)
     system_message = "Read carefully the whitepaper, reason about the user question, and provide a comprehensive, git helpful and truthful response. Be direct and concise, using layman's language that is easy to understand. Avoid filler content, and reply with your answer in a single short sentence or paragraph and nothing else (no preambles, greetings, etc.)."
     user_message = ps.create_interrogate_user_prompt(question, context)
     response = run_instructor_query(
-        system_message, user_message, None, llm_model="gpt-4o"
+        system_message,
+        user_message,
+        None,
+        llm_model="gpt-4o",
+        stream=stream,
+        interactive=True,
     )
+    if stream:
+        return strip_stream_tags(response)
     response = response.replace("<response>", "").replace("</response>", "")
     return response
 
@@ -307,70 +820,312 @@ def decide_query_action(user_question: str) -> ps.QueryDecision:
     """Decide the query action based on the user question."""
     system_message = "Please analyze the following user query and answer the question."
     user_message = ps.create_decision_user_prompt(user_question)
-    response = run_instructor_query(system_message, user_message, ps.QueryDecision)
+    response = run_instructor_query(
+        system_message, user_message, ps.QueryDecision, interactive=True
+    )
     return response
 
 
 def convert_query_to_vector(query: str, model_name: str):
-    if "embed-english" in model_name:
-        embeddings = CohereEmbeddings(
-            cohere_api_key=os.getenv("COHERE_API_KEY"), model=model_name
-        )
-    else:
-        embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    return query_embedder.embed(query, model_name)
 
-    return embeddings.embed_query(query)
 
+SEARCH_COLLECTION_NAME = "arxiv_abstracts"
+SEARCH_EMBEDDING_MODEL = "embed-english-v3.0"
+## Cosine distance; equivalent to the former L2 < 1 cutoff on unit-norm embeddings.
+SEARCH_MAX_DISTANCE = 0.5
+USE_LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "0").lower() in ("1", "true")
+## "vector" (embeddings only) or "hybrid" (embeddings + full-text, rank-fused).
+SEARCH_RETRIEVAL_MODE = os.getenv("SEARCH_RETRIEVAL_MODE", "vector")
 
-def format_query_condition(field_name: str, template: str, value: str):
-    if isinstance(value, list) and "semantic_search_queries" in field_name:
-        distance_scores = []
-        for query in value:
-            vector = convert_query_to_vector(query, "embed-english-v3.0")
-            vector_str = ", ".join(map(str, vector))
-            condition = f"l.embedding <-> ARRAY[{vector_str}]::vector "
-            distance_scores.append(condition)
-        if distance_scores:
-            min_distance = f"LEAST({', '.join(distance_scores)})"
-            return (
-                f"({' OR '.join([c + ' < 1' for c in distance_scores])})",
-                min_distance,
-            )
-        else:
-            return "AND TRUE", "0 as min_distance"
-    elif isinstance(value, list):
-        value_str = "', '".join(value)
-        return template % value_str, "0 as min_distance"
-    else:
-        return template % value, "0 as min_distance"
 
+def format_query_condition(field_name: str, template: str, value) -> Tuple[str, dict]:
+    """Render a filter condition with its bound parameters."""
+    if field_name == "title":
+        value = f"%{value}%"
+    elif isinstance(value, list):
+        value = [getattr(v, "value", v) for v in value]
+    return template, {field_name: value}
 
-def generate_query(criteria: ps.SearchCriteria, config: dict) -> str:
-    query_parts = [
-        "SELECT a.arxiv_code, a.title,  a.published, s.citation_count, a.summary AS abstract, ",
-        "FROM arxiv_details a, semantic_details s, topics t, langchain_pg_embedding l ",
-        "WHERE a.arxiv_code = s.arxiv_code "
-        "AND a.arxiv_code = t.arxiv_code "
-        "AND l.collection_id = '7bf1c691-da2b-4a2b-81b3-e7dd165bfa39' "
-        "AND a.arxiv_code = l.cmetadata ->> 'arxiv_code' ",
-    ]
-    extra_selects = []
 
-    for field, value in criteria.model_dump(exclude_none=True).items():
+def build_filter_conditions(criteria_dict: dict, config: dict) -> Tuple[str, dict]:
+    """Render the criteria's filter fields as `AND ...` lines with their params."""
+    conditions = []
+    params = {}
+    for field, value in criteria_dict.items():
         if field in config:
-            condition_str, max_similarity = format_query_condition(
+            condition_str, condition_params = format_query_condition(
                 field, config[field], value
             )
-            query_parts.append(f"AND {condition_str}")
-            extra_selects.append(max_similarity)
+            conditions.append(f"AND {condition_str}")
+            params.update(condition_params)
+    return "\n".join(conditions), params
+
+
+def build_semantic_scans(
+    semantic_queries: List[str], conditions_str: str, params: dict, k_param: str
+) -> List[str]:
+    """One top-k nearest neighbour subquery per semantic query (`ORDER BY
+    distance LIMIT`, so a pgvector index can be used). Adds the query vectors
+    to `params`; expects a `collection` CTE."""
+    semantic_scans = []
+    for idx, query in enumerate(semantic_queries):
+        vector = convert_query_to_vector(query, SEARCH_EMBEDDING_MODEL)
+        params[f"query_vector_{idx}"] = "[" + ",".join(map(str, vector)) + "]"
+        semantic_scans.append(
+            f"""
+            (SELECT a.arxiv_code, a.title, a.published, s.citation_count,
+                    a.summary AS abstract,
+                    l.embedding <=> CAST(%(query_vector_{idx})s AS vector) AS distance
+             FROM langchain_pg_embedding l
+             JOIN arxiv_details a ON a.arxiv_code = l.cmetadata ->> 'arxiv_code'
+             JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+             JOIN topics t ON a.arxiv_code = t.arxiv_code
+             WHERE l.collection_id = (SELECT uuid FROM collection)
+             {conditions_str}
+             ORDER BY distance
+             LIMIT %({k_param})s)
+            """
+        )
+    return semantic_scans
+
+
+def generate_query(
+    criteria: ps.SearchCriteria,
+    config: dict,
+    collection_name: str = SEARCH_COLLECTION_NAME,
+    k: int = 20,
+) -> Tuple[str, dict]:
+    """Build the paper search SQL and its parameters. Each semantic query is its
+    own top-k nearest neighbour scan, and results are merged on the smallest
+    distance."""
+    criteria_dict = criteria.model_dump(exclude_none=True)
+    semantic_queries = criteria_dict.pop("semantic_search_queries", None) or []
+    conditions_str, params = build_filter_conditions(criteria_dict, config)
+    params["k"] = k
+
+    if not semantic_queries:
+        sql = f"""
+            SELECT a.arxiv_code, a.title, a.published, s.citation_count,
+                   a.summary AS abstract, 0 AS distance
+            FROM arxiv_details a
+            JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+            JOIN topics t ON a.arxiv_code = t.arxiv_code
+            WHERE TRUE
+            {conditions_str}
+            ORDER BY a.published DESC
+            LIMIT %(k)s;
+            """
+        return sql, params
+
+    params["collection_name"] = collection_name
+    params["max_distance"] = SEARCH_MAX_DISTANCE
+    semantic_scans = build_semantic_scans(semantic_queries, conditions_str, params, "k")
+
+    sql = f"""
+        WITH collection AS (
+            SELECT uuid FROM langchain_pg_collection WHERE name = %(collection_name)s
+        ),
+        matches AS (
+            {" UNION ALL ".join(semantic_scans)}
+        )
+        SELECT * FROM (
+            SELECT DISTINCT ON (arxiv_code) *
+            FROM matches
+            ORDER BY arxiv_code, distance
+        ) m
+        WHERE distance < %(max_distance)s
+        ORDER BY distance
+        LIMIT %(k)s;
+        """
+    return sql, params
+
+
+## Reciprocal rank fusion constant (score = sum over legs of 1 / (RRF_K + rank)).
+RRF_K = 60
+## Acronyms too common in this corpus to be useful exact-match terms.
+GENERIC_LEXICAL_TERMS = {"llm", "llms", "ai", "nlp", "ml", "lm", "lms", "gpu", "gpus"}
+
+
+def extract_lexical_query(criteria: ps.SearchCriteria) -> str:
+    """Pick the exact-match terms of the search criteria (title and semantic
+    queries): tokens with digits, inner capitals or all caps, such as model and
+    benchmark names (GPT-4, LoRA, MMLU). Generic words are left to the vector
+    leg, since they match most of the corpus. Empty if there are none."""
+    texts = [criteria.title or ""] + (criteria.semantic_search_queries or [])
+    terms = []
+    for token in re.findall(r"[A-Za-z0-9][\w.+-]*[\w+]|\w", " ".join(texts)):
+        is_exact = (
+            any(ch.isdigit() for ch in token)
+            or any(ch.isupper() for ch in token[1:])
+            or (len(token) > 1 and token.isupper())
+        )
+        if (
+            is_exact
+            and token.lower() not in GENERIC_LEXICAL_TERMS
+            and token not in terms
+        ):
+            terms.append(token)
+    return " ".join(terms)
+
+
+def generate_hybrid_query(
+    criteria: ps.SearchCriteria,
+    config: dict,
+    lexical_query: str,
+    collection_name: str = SEARCH_COLLECTION_NAME,
+    k: int = 20,
+    vector_k: int = None,
+    lexical_k: int = None,
+) -> Tuple[str, dict]:
+    """Build a hybrid search SQL that fuses, with reciprocal rank fusion:
+    - the vector leg (`vector_k` nearest abstracts per semantic query),
+    - a full-text leg over titles and abstracts (any lexical term, ranked),
+    - a full-text leg over chunk text (all lexical terms, best chunk per paper).
+    Full-text legs match and rank on the stored, GIN-indexed `search_tsv`
+    columns (see `db.create_lexical_search_indexes`). `lexical_query` holds
+    space-separated terms (see `extract_lexical_query`). Filters apply to every
+    leg. Papers found only lexically are reported at `SEARCH_MAX_DISTANCE`; rows
+    come out ordered by fused score."""
+    criteria_dict = criteria.model_dump(exclude_none=True)
+    semantic_queries = criteria_dict.pop("semantic_search_queries", None) or []
+    conditions_str, params = build_filter_conditions(criteria_dict, config)
+    params.update(
+        {
+            "k": k,
+            "vector_k": vector_k or max(k // 2, 5),
+            "lexical_k": lexical_k or k,
+            "rrf_k": RRF_K,
+            "collection_name": collection_name,
+            "max_distance": SEARCH_MAX_DISTANCE,
+        }
+    )
 
-    if len(extra_selects) > 1:
-        extra_selects = list(filter(lambda x: x != "0 as min_distance", extra_selects))
+    ## Each term is matched as a phrase, so "GPT-4" does not match any "4".
+    term_queries = []
+    for idx, term in enumerate(lexical_query.split()):
+        params[f"lexical_term_{idx}"] = term
+        term_queries.append(f"phraseto_tsquery('english', %(lexical_term_{idx})s)")
+    if not term_queries:
+        raise ValueError("Hybrid search needs at least one lexical term.")
 
-    query_parts[0] += ", ".join(extra_selects)
-    query_parts.append("ORDER BY 6 ASC ")
+    semantic_scans = build_semantic_scans(
+        semantic_queries, conditions_str, params, "vector_k"
+    )
+    if semantic_scans:
+        vector_matches = " UNION ALL ".join(semantic_scans)
+    else:
+        vector_matches = (
+            "SELECT NULL::text AS arxiv_code, NULL::float AS distance WHERE FALSE"
+        )
 
-    return "\n".join(query_parts)
+    sql = f"""
+        WITH collection AS (
+            SELECT uuid FROM langchain_pg_collection WHERE name = %(collection_name)s
+        ),
+        lexical AS (
+            SELECT {" && ".join(term_queries)} AS all_terms,
+                   {" || ".join(term_queries)} AS any_terms
+        ),
+        vector_matches AS (
+            {vector_matches}
+        ),
+        vector_leg AS (
+            SELECT arxiv_code, distance,
+                   ROW_NUMBER() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT DISTINCT ON (arxiv_code) arxiv_code, distance
+                FROM vector_matches
+                ORDER BY arxiv_code, distance
+            ) v
+            WHERE distance < %(max_distance)s
+        ),
+        paper_leg AS (
+            SELECT arxiv_code, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+            FROM (
+                SELECT DISTINCT ON (a.arxiv_code) a.arxiv_code,
+                       ts_rank_cd(a.search_tsv, q.any_terms) AS score
+                FROM arxiv_details a
+                JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+                JOIN topics t ON a.arxiv_code = t.arxiv_code
+                CROSS JOIN lexical q
+                WHERE a.search_tsv @@ q.any_terms
+                {conditions_str}
+                ORDER BY a.arxiv_code
+            ) p
+            ORDER BY score DESC
+            LIMIT %(lexical_k)s
+        ),
+        chunk_leg AS (
+            SELECT arxiv_code, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+            FROM (
+                SELECT c.arxiv_code, MAX(ts_rank_cd(c.search_tsv, q.all_terms)) AS score
+                FROM arxiv_chunks c
+                JOIN arxiv_details a ON a.arxiv_code = c.arxiv_code
+                JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+                JOIN topics t ON a.arxiv_code = t.arxiv_code
+                CROSS JOIN lexical q
+                WHERE c.search_tsv @@ q.all_terms
+                {conditions_str}
+                GROUP BY c.arxiv_code
+            ) c
+            ORDER BY score DESC
+            LIMIT %(lexical_k)s
+        ),
+        fused AS (
+            SELECT arxiv_code, SUM(1.0 / (%(rrf_k)s + rank)) AS score
+            FROM (
+                SELECT arxiv_code, rank FROM vector_leg
+                UNION ALL SELECT arxiv_code, rank FROM paper_leg
+                UNION ALL SELECT arxiv_code, rank FROM chunk_leg
+            ) legs
+            GROUP BY arxiv_code
+            ORDER BY score DESC
+            LIMIT %(k)s
+        )
+        SELECT a.arxiv_code, a.title, a.published, s.citation_count,
+               a.summary AS abstract,
+               COALESCE(v.distance, %(max_distance)s) AS distance
+        FROM fused f
+        JOIN arxiv_details a ON a.arxiv_code = f.arxiv_code
+        JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+        LEFT JOIN vector_leg v ON v.arxiv_code = f.arxiv_code
+        ORDER BY f.score DESC;
+        """
+    return sql, params
+
+
+def warm_local_index():
+    """Start loading and syncing the ANN index in the background."""
+    vi.get_vector_index(SEARCH_COLLECTION_NAME).schedule_sync()
+
+
+def local_index_ready() -> bool:
+    """Whether the ANN index can serve searches. Until its first build is done
+    (in the background), searches go to pgvector instead."""
+    index = vi.get_vector_index(SEARCH_COLLECTION_NAME)
+    if not index.is_ready:
+        index.schedule_sync()
+    return index.is_ready
+
+
+def search_local_index(criteria: ps.SearchCriteria, k: int = 20) -> list:
+    """Semantic search against the in-process ANN index, with the criteria's
+    title/date/citation filters applied before scoring. Returns rows shaped
+    like those of `generate_query`."""
+    index = vi.get_vector_index(SEARCH_COLLECTION_NAME)
+    filters = criteria.model_dump(exclude_none=True)
+    semantic_queries = filters.pop("semantic_search_queries", None) or []
+    best_distances = {}
+    for query in semantic_queries:
+        vector = convert_query_to_vector(query, SEARCH_EMBEDDING_MODEL)
+        for arxiv_code, distance in index.search(vector, k=k, filters=filters):
+            if distance < best_distances.get(arxiv_code, SEARCH_MAX_DISTANCE):
+                best_distances[arxiv_code] = distance
+
+    ranked_codes = sorted(best_distances, key=best_distances.get)[:k]
+    rows = db.get_search_documents(ranked_codes)
+    return [row + (best_distances[row[0]],) for row in rows]
 
 
 def rerank_documents_new(
@@ -381,23 +1136,194 @@ def rerank_documents_new(
 
     rerank_msg = ps.create_rerank_user_prompt(user_question, documents)
     response = run_instructor_query(
-        system_message, rerank_msg, ps.RerankedDocuments, llm_model=llm_model
+        system_message,
+        rerank_msg,
+        ps.RerankedDocuments,
+        llm_model=llm_model,
+        interactive=True,
     )
     return response
 
 
+###############
+## RERANKING ##
+###############
+
+
+class Reranker(ABC):
+    """Interface for chat rerankers: decide which retrieved documents are kept
+    to answer a question. Returns the same structure as the LLM reranker."""
+
+    @abstractmethod
+    def rerank(
+        self, user_question: str, documents: List[Document]
+    ) -> ps.RerankedDocuments:
+        """Mark each document (by position) as selected or not."""
+
+
+class LLMReranker(Reranker):
+    """Ask an LLM to read every abstract and select the relevant ones."""
+
+    def __init__(self, llm_model: str = "gpt-4o-mini"):
+        self.llm_model = llm_model
+
+    def rerank(
+        self, user_question: str, documents: List[Document]
+    ) -> ps.RerankedDocuments:
+        return rerank_documents_new(user_question, documents, llm_model=self.llm_model)
+
+
+class LocalReranker(Reranker):
+    """Rerank without an LLM call. Relevance is the cosine similarity between
+    the question and each paper's stored abstract embedding (or, if a model is
+    found at `cross_encoder_path`, a cross-encoder score on question/abstract),
+    plus small citation and recency boosts. Keeps up to `max_selected` papers
+    whose relevance is within `relevance_margin` of the best one."""
+
+    def __init__(
+        self,
+        max_selected: int = 8,
+        relevance_margin: float = 0.1,
+        citation_weight: float = 0.05,
+        recency_weight: float = 0.05,
+        recency_half_life_days: int = 365,
+        cross_encoder_path: str = None,
+    ):
+        self.max_selected = max_selected
+        self.relevance_margin = relevance_margin
+        self.citation_weight = citation_weight
+        self.recency_weight = recency_weight
+        self.recency_half_life_days = recency_half_life_days
+        self.cross_encoder_path = cross_encoder_path or os.getenv(
+            "RERANK_CROSS_ENCODER_PATH"
+        )
+        self._cross_encoder = None
+        self._lock = threading.Lock()
+
+    def _get_cross_encoder(self):
+        """Load the optional cross-encoder once; None if absent."""
+        if not self.cross_encoder_path or not os.path.exists(self.cross_encoder_path):
+            return None
+        with self._lock:
+            if self._cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+
+                self._cross_encoder = CrossEncoder(self.cross_encoder_path)
+        return self._cross_encoder
+
+    def relevance(self, user_question: str, documents: List[Document]) -> np.ndarray:
+        cross_encoder = self._get_cross_encoder()
+        if cross_encoder is not None:
+            logits = cross_encoder.predict(
+                [(user_question, d.abstract) for d in documents]
+            )
+            return 1 / (1 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+        question = np.array(
+            convert_query_to_vector(user_question, SEARCH_EMBEDDING_MODEL),
+            dtype=np.float32,
+        )
+        question /= max(np.linalg.norm(question), 1e-12)
+        codes, vectors = db.get_collection_embeddings(
+            SEARCH_COLLECTION_NAME, [d.arxiv_code for d in documents]
+        )
+        similarity_map = {}
+        if len(codes):
+            norms = np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+            similarity_map = dict(zip(codes, (vectors @ question) / norms))
+        ## Papers without a stored embedding fall back to their search distance.
+        return np.array(
+            [similarity_map.get(d.arxiv_code, 1 - d.distance) for d in documents],
+            dtype=np.float32,
+        )
+
+    def rerank(
+        self, user_question: str, documents: List[Document]
+    ) -> ps.RerankedDocuments:
+        if not documents:
+            return ps.RerankedDocuments(documents=[])
+        relevance = self.relevance(user_question, documents)
+
+        citations = np.log1p([max(d.citations or 0, 0) for d in documents])
+        citations = citations / max(citations.max(), 1e-12)
+        ## Ages in UTC, whether or not the DB returns tz-aware timestamps.
+        now = pd.Timestamp.now(tz="UTC")
+        published = [pd.Timestamp(d.published_date) for d in documents]
+        age_days = np.array(
+            [
+                (now - (p.tz_convert("UTC") if p.tzinfo else p.tz_localize("UTC"))).days
+                for p in published
+            ]
+        )
+        recency = 0.5 ** (np.maximum(age_days, 0) / self.recency_half_life_days)
+        scores = (
+            relevance + self.citation_weight * citations + self.recency_weight * recency
+        )
+
+        min_relevance = relevance.max() - self.relevance_margin
+        ranked = [i for i in np.argsort(-scores) if relevance[i] >= min_relevance]
+        selected = set(ranked[: self.max_selected])
+        return ps.RerankedDocuments(
+            documents=[
+                ps.DocumentAnalysis(
+                    document_id=i,
+                    analysis=(
+                        f"relevance={relevance[i]:.3f}, citations={citations[i]:.2f}, "
+                        f"recency={recency[i]:.2f}, score={scores[i]:.3f}"
+                    ),
+                    selected=i in selected,
+                )
+                for i in range(len(documents))
+            ]
+        )
+
+
+rerankers = {
+    "local": LocalReranker,
+    "llm": LLMReranker,
+}
+
+## Default chat reranker ("local" or "llm"); selectable per call.
+CHAT_RERANKER = os.getenv("CHAT_RERANKER", "local")
+
+_rerankers = {}
+_rerankers_lock = threading.Lock()
+
+
+def get_reranker(reranker=None, llm_model: str = "gpt-4o-mini") -> Reranker:
+    """Resolve a reranker name (or pass through a Reranker instance). Local
+    rerankers are shared per process so optional models load once."""
+    if isinstance(reranker, Reranker):
+        return reranker
+    name = reranker or CHAT_RERANKER
+    if name not in rerankers:
+        raise ValueError(f"Unknown reranker: {name}")
+    if name == "llm":
+        return LLMReranker(llm_model)
+    with _rerankers_lock:
+        if name not in _rerankers:
+            _rerankers[name] = rerankers[name]()
+        return _rerankers[name]
+
+
 def resolve_query(
     user_question: str,
     documents: list[Document],
     response_length: str,
     llm_model="gpt-4o",
+    stream: bool = False,
 ):
     system_message = "You are an AI academic focused on Large Language Models. Please answer the user query leveraging the information provided in the context."
     user_message = ps.create_resolve_user_prompt(
         user_question, documents, response_length
     )
     response = run_instructor_query(
-        system_message, user_message, None, llm_model=llm_model
+        system_message,
+        user_message,
+        None,
+        llm_model=llm_model,
+        stream=stream,
+        interactive=True,
     )
     return response
 
@@ -406,51 +1332,105 @@ def resolve_query_other(user_question: str) -> str:
     """Decide the query action based on the user question."""
     system_message = "You are the GPT Maestro, maintainer of the LLMpedia, a web-based Large Language Model encyclopedia. You received the following unrelated comment from a user via our chat based system. Please respond to it in a friendly, slightly-sarcastic, serious and very concise (less than 20 words) manner."
     user_message = f"{user_question}"
-    response = run_instructor_query(system_message, user_message, None)
+    response = run_instructor_query(
+        system_message, user_message, None, interactive=True
+    )
     return response
 
 
+def create_search_criteria(user_question: str, llm_model="gpt-4o") -> ps.SearchCriteria:
+    """Extract structured search criteria from the user question."""
+    query_obj = run_instructor_query(
+        ps.VS_QUERY_SYSTEM_PROMPT,
+        ps.create_query_user_prompt(user_question),
+        ps.SearchCriteria,
+        llm_model=llm_model,
+        interactive=True,
+    )
+    query_obj.topic_categories = None
+    return query_obj
+
+
+def fetch_documents(
+    query_obj: ps.SearchCriteria,
+    use_local_index: bool = USE_LOCAL_VECTOR_INDEX,
+    k: int = 20,
+    retrieval_mode: str = SEARCH_RETRIEVAL_MODE,
+) -> List[Document]:
+    """Run the paper search for a set of criteria. In "hybrid" mode the exact
+    terms of the criteria drive the full-text legs; without any, the search
+    is vector only."""
+    if retrieval_mode not in ("vector", "hybrid"):
+        raise ValueError(f"Unknown retrieval mode: {retrieval_mode}")
+    lexical_query = (
+        extract_lexical_query(query_obj) if retrieval_mode == "hybrid" else ""
+    )
+    if lexical_query:
+        sql, params = generate_hybrid_query(query_obj, query_config, lexical_query, k=k)
+        rows = db.execute_query(sql, params=params)
+    elif use_local_index and query_obj.semantic_search_queries and local_index_ready():
+        rows = search_local_index(query_obj, k=k)
+    else:
+        sql, params = generate_query(query_obj, query_config, k=k)
+        rows = db.execute_query(sql, params=params)
+    return [Document(**dict(zip(Document.__fields__.keys(), d))) for d in rows]
+
+
+def select_reranked_documents(
+    documents: List[Document], reranked_documents: ps.RerankedDocuments
+) -> List[Document]:
+    filtered_document_ids = [
+        int(d.document_id) for d in reranked_documents.documents if d.selected
+    ]
+    return [d for i, d in enumerate(documents) if i in filtered_document_ids]
+
+
+def format_answer_references(
+    answer: str, filtered_arxiv_codes: List[str]
+) -> Tuple[str, List[str], List[str]]:
+    """Add paper links to the answer and split sources into referenced / other."""
+    answer_augment = add_links_to_text_blob(answer)
+    referenced_arxiv_codes = extract_arxiv_codes(answer_augment)
+    filtered_arxiv_codes = [
+        d for d in filtered_arxiv_codes if d not in referenced_arxiv_codes
+    ]
+    return answer_augment, referenced_arxiv_codes, filtered_arxiv_codes
+
+
 def query_llmpedia_new(
     user_question: str,
     response_length: str = "Normal",
     query_llm_model="gpt-4o",
     rerank_llm_model="gpt-4o-mini",
     response_llm_model="gpt-4o",
+    use_local_index: bool = USE_LOCAL_VECTOR_INDEX,
+    retrieval_mode: str = SEARCH_RETRIEVAL_MODE,
+    reranker=CHAT_RERANKER,
 ) -> Tuple[str, List[str], List[str]]:
-    """Extended RAG workflow to answer a user query with the LLMpedia."""
+    """Extended RAG workflow to answer a user query with the LLMpedia. The
+    `rerank_llm_model` is only used with `reranker="llm"`."""
     action = decide_query_action(user_question)
 
     if action.llm_query:
         ## Create query.
-        query_obj = run_instructor_query(
-            ps.VS_QUERY_SYSTEM_PROMPT,
-            ps.create_query_user_prompt(user_question),
-            ps.SearchCriteria,
-            llm_model=query_llm_model,
-        )
+        query_obj = create_search_criteria(user_question, llm_model=query_llm_model)
 
         ## Fetch results.
-        query_obj.topic_categories = None
-        sql = generate_query(query_obj, query_config)
-        documents = db.execute_query(sql, limit=20)
+        documents = fetch_documents(
+            query_obj,
+            use_local_index=use_local_index,
+            retrieval_mode=retrieval_mode,
+        )
         if len(documents) == 0:
-            return "Sorry, I don't know about that.", [], []
-        documents = [
-            Document(**dict(zip(Document.__fields__.keys(), d))) for d in documents
-        ]
+            return NO_ANSWER_RESPONSE, [], []
 
         ## Rerank.
-        reranked_documents = rerank_documents_new(
-            user_question, documents, llm_model=rerank_llm_model
+        reranked_documents = get_reranker(reranker, llm_model=rerank_llm_model).rerank(
+            user_question, documents
         )
-        filtered_document_ids = [
-            int(d.document_id) for d in reranked_documents.documents if d.selected
-        ]
-        filtered_documents = [
-            d for i, d in enumerate(documents) if i in filtered_document_ids
-        ]
+        filtered_documents = select_reranked_documents(documents, reranked_documents)
         if len(filtered_documents) == 0:
-            return "Sorry, I don't know about that.", [], []
+            return NO_ANSWER_RESPONSE, [], []
 
         ## Resolve.
         answer = resolve_query(
@@ -459,19 +1439,194 @@ def query_llmpedia_new(
             response_length,
             llm_model=response_llm_model,
         )
-        answer_augment = add_links_to_text_blob(answer)
-        referenced_arxiv_codes = extract_arxiv_codes(answer_augment)
-        filtered_arxiv_codes = [d.arxiv_code for d in filtered_documents]
-        filtered_arxiv_codes = [
-            d for d in filtered_arxiv_codes if d not in referenced_arxiv_codes
-        ]
-        return answer_augment, referenced_arxiv_codes, filtered_arxiv_codes
+        return format_answer_references(
+            answer, [d.arxiv_code for d in filtered_documents]
+        )
 
     else:
         answer = resolve_query_other(user_question)
         return answer, [], []
 
 
+## Seconds allowed per step of the async chat pipeline.
+QUERY_STEP_TIMEOUTS = {
+    "decide": 20,
+    "criteria": 30,
+    "embed": 15,
+    "search": 15,
+    "rerank": 45,
+    "resolve": 90,
+}
+
+
+## Shared worker threads for the blocking calls of the async pipeline. Kept off the
+## loop's default executor so `asyncio.run` does not wait on abandoned steps.
+_query_executor = ThreadPoolExecutor(
+    max_workers=16, thread_name_prefix="llmpedia-query"
+)
+
+
+def _run_in_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(_query_executor, partial(func, *args, **kwargs))
+
+
+async def _timed_step(name: str, awaitable, timings: dict):
+    """Await a pipeline step under its timeout, recording its wall time."""
+    start = time.monotonic()
+    try:
+        return await asyncio.wait_for(awaitable, timeout=QUERY_STEP_TIMEOUTS[name])
+    except asyncio.TimeoutError as e:
+        raise TimeoutError(
+            f"Chat step '{name}' timed out after {QUERY_STEP_TIMEOUTS[name]}s."
+        ) from e
+    finally:
+        timings[name] = round(time.monotonic() - start, 3)
+
+
+_STREAM_END = object()
+
+
+def _timed_stream(stream, timings: dict, resolve_start: float, pipeline_start: float):
+    """Pass a text stream through, recording first-token and completion times.
+    Chunks are pulled on the query executor so the resolve step's timeout also
+    bounds the stream: TimeoutError is raised once it is exceeded."""
+    deadline = resolve_start + QUERY_STEP_TIMEOUTS["resolve"]
+    iterator = iter(stream)
+    idx = 0
+    while True:
+        future = _query_executor.submit(next, iterator, _STREAM_END)
+        try:
+            chunk = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError as e:
+            raise TimeoutError(
+                f"Chat step 'resolve' timed out after {QUERY_STEP_TIMEOUTS['resolve']}s."
+            ) from e
+        if chunk is _STREAM_END:
+            break
+        if idx == 0:
+            timings["first_token"] = round(time.monotonic() - pipeline_start, 3)
+        idx += 1
+        yield chunk
+    timings["resolve"] = round(time.monotonic() - resolve_start, 3)
+    timings["total"] = round(time.monotonic() - pipeline_start, 3)
+
+
+async def aquery_llmpedia_new(
+    user_question: str,
+    response_length: str = "Normal",
+    query_llm_model="gpt-4o",
+    rerank_llm_model="gpt-4o-mini",
+    response_llm_model="gpt-4o",
+    use_local_index: bool = USE_LOCAL_VECTOR_INDEX,
+    stream: bool = False,
+    retrieval_mode: str = SEARCH_RETRIEVAL_MODE,
+    reranker=CHAT_RERANKER,
+) -> Tuple[str, List[str], List[str], dict]:
+    """Concurrent version of `query_llmpedia_new`. Criteria extraction starts
+    speculatively alongside the intent decision, and all semantic queries are
+    embedded in parallel. Returns per-step timings (seconds) with the answer.
+
+    With `stream=True` a retrieval answer is returned as a generator of text
+    chunks, with no referenced codes and all selected papers as relevant codes;
+    once consumed, pass the full text to `format_answer_references`. Timings
+    for the resolve step are filled in when the stream completes."""
+    timings = {}
+    pipeline_start = time.monotonic()
+
+    decide_task = asyncio.create_task(
+        _timed_step(
+            "decide", _run_in_thread(decide_query_action, user_question), timings
+        )
+    )
+    criteria_task = asyncio.create_task(
+        _timed_step(
+            "criteria",
+            _run_in_thread(
+                create_search_criteria, user_question, llm_model=query_llm_model
+            ),
+            timings,
+        )
+    )
+
+    try:
+        action = await decide_task
+    except BaseException:
+        criteria_task.cancel()
+        raise
+
+    if not action.llm_query:
+        criteria_task.cancel()
+        answer = await _timed_step(
+            "resolve", _run_in_thread(resolve_query_other, user_question), timings
+        )
+        timings["total"] = round(time.monotonic() - pipeline_start, 3)
+        return answer, [], [], timings
+
+    query_obj = await criteria_task
+
+    ## Embed all semantic queries at once; the search then reads them from cache.
+    semantic_queries = query_obj.semantic_search_queries or []
+    await _timed_step(
+        "embed",
+        asyncio.gather(
+            *[
+                _run_in_thread(convert_query_to_vector, q, SEARCH_EMBEDDING_MODEL)
+                for q in semantic_queries
+            ]
+        ),
+        timings,
+    )
+    documents = await _timed_step(
+        "search",
+        _run_in_thread(
+            fetch_documents,
+            query_obj,
+            use_local_index=use_local_index,
+            retrieval_mode=retrieval_mode,
+        ),
+        timings,
+    )
+    if len(documents) == 0:
+        timings["total"] = round(time.monotonic() - pipeline_start, 3)
+        return NO_ANSWER_RESPONSE, [], [], timings
+
+    reranked_documents = await _timed_step(
+        "rerank",
+        _run_in_thread(
+            get_reranker(reranker, llm_model=rerank_llm_model).rerank,
+            user_question,
+            documents,
+        ),
+        timings,
+    )
+    filtered_documents = select_reranked_documents(documents, reranked_documents)
+    if len(filtered_documents) == 0:
+        timings["total"] = round(time.monotonic() - pipeline_start, 3)
+        return NO_ANSWER_RESPONSE, [], [], timings
+
+    filtered_arxiv_codes = [d.arxiv_code for d in filtered_documents]
+    resolve_start = time.monotonic()
+    answer = await _timed_step(
+        "resolve",
+        _run_in_thread(
+            resolve_query,
+            user_question,
+            filtered_documents,
+            response_length,
+            llm_model=response_llm_model,
+            stream=stream,
+        ),
+        timings,
+    )
+    if stream:
+        answer_stream = _timed_stream(answer, timings, resolve_start, pipeline_start)
+        return answer_stream, [], filtered_arxiv_codes, timings
+
+    timings["total"] = round(time.monotonic() - pipeline_start, 3)
+    return (*format_answer_references(answer, filtered_arxiv_codes), timings)
+
+
 def get_similar_titles(
     title: str, df: pd.DataFrame, n: int = 5
 ) -> Tuple[List[str], str]:
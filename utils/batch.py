@@ -0,0 +1,362 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Iterable
+import importlib
+import threading
+import httpx
+import json
+import time
+import uuid
+import os
+
+import utils.instruct as instruct
+
+BATCH_PATH = os.getenv("LLM_BATCH_PATH", "data/batches")
+BATCH_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+BATCH_POLL_INTERVAL = int(os.getenv("LLM_BATCH_POLL_INTERVAL", 60))
+
+###########
+## SPOOL ##
+###########
+
+
+class BatchSpool:
+    """JSONL file of provider-neutral LLM requests, one per unique cache key."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.keys = set()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        open(path, "w").close()
+
+    def add(
+        self,
+        custom_id,
+        provider,
+        llm_model,
+        system_message,
+        user_message,
+        model,
+        temperature,
+    ):
+        request = {
+            "custom_id": custom_id,
+            "provider": provider,
+            "llm_model": llm_model,
+            "system_message": system_message,
+            "user_message": user_message,
+            "temperature": temperature,
+            "response_model": (
+                f"{model.__module__}.{model.__qualname__}" if model else None
+            ),
+        }
+        with self._lock:
+            if custom_id in self.keys:
+                return
+            self.keys.add(custom_id)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(request) + "\n")
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def read_jsonl(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_response_model(path: str):
+    """Import a pydantic model from its dotted path (None for plain text)."""
+    if path is None:
+        return None
+    module_name, class_name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+@contextmanager
+def spooling(spool: BatchSpool):
+    """Route uncached `run_instructor_query` calls to `spool` (they raise
+    DeferredJob) for the duration of the block."""
+    instruct.batch_spool = spool
+    try:
+        yield spool
+    finally:
+        instruct.batch_spool = None
+
+
+###############
+## PROVIDERS ##
+###############
+
+
+class BatchProvider(ABC):
+    """Interface for offline batch backends. Results are dicts with `custom_id`
+    and either `response` (text, or JSON for structured requests) or `error`."""
+
+    @abstractmethod
+    def submit(self, spool_path: str) -> str:
+        """Upload a spool file as a batch job; returns its batch id."""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """One of 'pending', 'completed' or 'failed'."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterable[dict]:
+        """Yield the result dicts of a completed batch."""
+
+
+class LocalBatchProvider(BatchProvider):
+    """File-based stand-in that answers a spool synchronously on submit, by
+    default through the regular (uncached) `run_instructor_query` path. Pass a
+    `responder(request) -> str` to answer without calling any LLM."""
+
+    def __init__(self, directory: str = BATCH_PATH, responder: Callable = None):
+        self.directory = directory
+        self.responder = responder or self._default_responder
+
+    @staticmethod
+    def _default_responder(request: dict) -> str:
+        model = load_response_model(request["response_model"])
+        response = instruct.run_instructor_query(
+            request["system_message"],
+            request["user_message"],
+            model,
+            llm_model=request["llm_model"],
+            temperature=request["temperature"],
+            use_cache=False,
+        )
+        return response.model_dump_json() if model else response
+
+    def _results_path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.results.jsonl")
+
+    def submit(self, spool_path: str) -> str:
+        batch_id = f"local-{uuid.uuid4().hex[:12]}"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._results_path(batch_id), "w") as f:
+            for request in read_jsonl(spool_path):
+                try:
+                    result = {"response": self.responder(request)}
+                except Exception as e:
+                    result = {"error": str(e)}
+                result["custom_id"] = request["custom_id"]
+                f.write(json.dumps(result) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if os.path.exists(self._results_path(batch_id)) else "failed"
+
+    def results(self, batch_id: str) -> Iterable[dict]:
+        return read_jsonl(self._results_path(batch_id))
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """OpenAI Batch API (24h window, chat completions). Structured requests are
+    sent as a forced function call on the response model's JSON schema."""
+
+    def __init__(self, completion_window: str = "24h"):
+        self.completion_window = completion_window
+        self.client = instruct.get_llm_client("OpenAI")
+
+    @staticmethod
+    def _to_batch_line(request: dict) -> dict:
+        if request["provider"] != "OpenAI":
+            raise ValueError(
+                f"OpenAI batches cannot serve {request['provider']} requests."
+            )
+        body = {
+            "model": request["llm_model"],
+            "temperature": request["temperature"],
+            "messages": [
+                {"role": "system", "content": request["system_message"]},
+                {"role": "user", "content": request["user_message"]},
+            ],
+        }
+        model = load_response_model(request["response_model"])
+        if model is not None:
+            body["tools"] = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": model.__name__,
+                        "description": model.__doc__ or model.__name__,
+                        "parameters": model.model_json_schema(),
+                    },
+                }
+            ]
+            body["tool_choice"] = {
+                "type": "function",
+                "function": {"name": model.__name__},
+            }
+        return {
+            "custom_id": request["custom_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }
+
+    def submit(self, spool_path: str) -> str:
+        lines = [self._to_batch_line(r) for r in read_jsonl(spool_path)]
+        payload = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+        batch_file = self.client.files.create(
+            file=(os.path.basename(spool_path), payload), purpose="batch"
+        )
+        response = self.client.post(
+            "/batches",
+            body={
+                "input_file_id": batch_file.id,
+                "endpoint": "/v1/chat/completions",
+                "completion_window": self.completion_window,
+            },
+            cast_to=httpx.Response,
+        )
+        return response.json()["id"]
+
+    def _batch(self, batch_id: str) -> dict:
+        return self.client.get(f"/batches/{batch_id}", cast_to=httpx.Response).json()
+
+    def status(self, batch_id: str) -> str:
+        status = self._batch(batch_id)["status"]
+        if status == "completed":
+            return "completed"
+        if status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "pending"
+
+    def results(self, batch_id: str) -> Iterable[dict]:
+        output_file_id = self._batch(batch_id).get("output_file_id")
+        if output_file_id is None:
+            return []
+        content = self.client.files.content(output_file_id).text
+        results = []
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            result = {"custom_id": row["custom_id"]}
+            response = row.get("response") or {}
+            if row.get("error") or response.get("status_code") != 200:
+                result["error"] = str(row.get("error") or response.get("body"))
+            else:
+                message = response["body"]["choices"][0]["message"]
+                if message.get("tool_calls"):
+                    result["response"] = message["tool_calls"][0]["function"][
+                        "arguments"
+                    ]
+                else:
+                    result["response"] = (message.get("content") or "").strip()
+            results.append(result)
+        return results
+
+
+batch_providers = {
+    "local": LocalBatchProvider,
+    "openai": OpenAIBatchProvider,
+}
+
+
+def get_batch_provider(name: str = None) -> BatchProvider:
+    name = name or os.getenv("LLM_BATCH_PROVIDER", "openai")
+    return batch_providers[name]()
+
+
+############
+## RUNNER ##
+############
+
+
+def _load_state(state_path: str) -> dict:
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def _save_state(state_path: str, state: dict):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def wait_and_ingest(
+    provider: BatchProvider, batch_id: str, poll_interval: int = BATCH_POLL_INTERVAL
+) -> int:
+    """Poll a batch until done and store its responses in the LLM response
+    cache, where the stage's next pass will find them. Returns # ingested."""
+    while True:
+        status = provider.status(batch_id)
+        if status == "completed":
+            break
+        if status == "failed":
+            raise RuntimeError(f"Batch '{batch_id}' failed.")
+        time.sleep(poll_interval)
+
+    ingested = 0
+    for result in provider.results(batch_id):
+        if "response" not in result:
+            print(f"Batch request {result['custom_id'][:12]} failed: {result}")
+            continue
+        instruct.response_cache.put(result["custom_id"], "batch", result["response"])
+        ingested += 1
+    return ingested
+
+
+def run_stage_in_batches(
+    stage: Callable,
+    name: str,
+    provider: BatchProvider = None,
+    poll_interval: int = BATCH_POLL_INTERVAL,
+    max_rounds: int = None,
+):
+    """Run a workflow stage against an offline batch provider instead of live
+    LLM calls. Each pass runs `stage()` with uncached requests spooled to JSONL
+    (those items are deferred); the spool is submitted, polled and its results
+    ingested into the response cache, and the stage runs again. Items whose
+    requests are all answered go through the stage's normal commit path, so
+    results land in the usual tables. Multi-step prompts take one round per
+    step. Rounds continue until nothing is spooled (or `max_rounds` is hit,
+    which raises). An in-flight batch is resumed if the process is restarted."""
+    if instruct.response_cache is None:
+        instruct.response_cache = instruct.LLMResponseCache(
+            BATCH_CACHE_PATH,
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", 512)) * 1024**2,
+        )
+    provider = provider or get_batch_provider()
+    stage_dir = os.path.join(BATCH_PATH, name)
+    os.makedirs(stage_dir, exist_ok=True)
+    state_path = os.path.join(stage_dir, "state.json")
+
+    state = _load_state(state_path)
+    if state.get("batch_id"):
+        print(f"Resuming batch '{state['batch_id']}'...")
+        wait_and_ingest(provider, state["batch_id"], poll_interval)
+        _save_state(state_path, {})
+
+    round_idx = 0
+    while max_rounds is None or round_idx < max_rounds:
+        spool = BatchSpool(os.path.join(stage_dir, f"round_{round_idx}.jsonl"))
+        with spooling(spool):
+            stage()
+        if len(spool) == 0:
+            print(f"Batch stage '{name}' complete after {round_idx} round(s).")
+            return
+
+        batch_id = provider.submit(spool.path)
+        _save_state(state_path, {"batch_id": batch_id, "spool": spool.path})
+        print(f"Submitted batch '{batch_id}' with {len(spool)} requests.")
+        ingested = wait_and_ingest(provider, batch_id, poll_interval)
+        _save_state(state_path, {})
+        print(f"Ingested {ingested}/{len(spool)} responses.")
+        if ingested == 0:
+            raise RuntimeError(
+                f"Batch stage '{name}' made no progress in round {round_idx}."
+            )
+        round_idx += 1
+
+    raise RuntimeError(
+        f"Batch stage '{name}' still had pending requests after {max_rounds} rounds."
+    )
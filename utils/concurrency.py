@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable
+from tqdm import tqdm
+import threading
+import random
+import time
+import os
+
+###################
+## RATE LIMITING ##
+###################
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1):
+        """Block until `amount` tokens are available, then take them."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_time = (amount - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+## Cap on concurrent calls per provider (also sizes its HTTP connection pool).
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+
+
+class ProviderLimiter:
+    """Request and token budgets for one LLM provider, with a shared cool-down
+    that grows on consecutive rate-limit errors and resets on success.
+    `in_flight` bounds the provider's concurrent calls process-wide, however
+    many (nested) worker pools issue them."""
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        base_backoff: float = 2.0,
+        max_in_flight: int = LLM_MAX_CONNECTIONS,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.base_backoff = base_backoff
+        self.max_backoff = 120.0
+        self._pause_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, expected_tokens: int):
+        with self._lock:
+            pause = self._pause_until - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+        self.requests.acquire(1)
+        self.tokens.acquire(expected_tokens)
+
+    def backoff(self) -> float:
+        """Register a rate-limit error; returns the seconds all callers pause."""
+        with self._lock:
+            self._strikes += 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (self._strikes - 1))
+            delay *= 1 + random.random() * 0.25
+            self._pause_until = max(self._pause_until, time.monotonic() + delay)
+            return delay
+
+    def success(self):
+        with self._lock:
+            self._strikes = 0
+
+
+## Per-provider budgets; override with LLM_RPM_<PROVIDER> / LLM_TPM_<PROVIDER>.
+default_limits = {
+    "OpenAI": {"rpm": 500, "tpm": 300_000},
+    "Anthropic": {"rpm": 50, "tpm": 80_000},
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = default_limits.get(provider, {"rpm": 60, "tpm": 100_000})
+            rpm = int(os.getenv(f"LLM_RPM_{provider.upper()}", limits["rpm"]))
+            tpm = int(os.getenv(f"LLM_TPM_{provider.upper()}", limits["tpm"]))
+            _limiters[provider] = ProviderLimiter(rpm, tpm)
+        return _limiters[provider]
+
+
+#######################
+## CONCURRENT STAGES ##
+#######################
+
+
+class DeferredJob(BaseException):
+    """Raised by a job whose work was handed off (e.g. spooled to an offline
+    batch) instead of done now. Derives from BaseException so per-item retry
+    loops (`except Exception`) do not swallow it; the item is skipped."""
+
+
+WORKFLOW_MAX_WORKERS = int(os.getenv("WORKFLOW_MAX_WORKERS", 8))
+
+
+def run_concurrent(
+    items: Iterable,
+    job: Callable,
+    commit: Callable,
+    max_workers: int = WORKFLOW_MAX_WORKERS,
+    desc: str = None,
+) -> dict:
+    """Run `job(item)` for each item on a thread pool and `commit(item, result)`
+    on the calling thread, in input order. At most `2 * max_workers` jobs are
+    in flight or awaiting commit. Jobs returning None (or raising DeferredJob) are
+    skipped; failing jobs are reported and skipped. Returns counts and throughput."""
+    items = list(items)
+    pending = {}
+    results = {}
+    next_submit, next_commit = 0, 0
+    stats = {"committed": 0, "skipped": 0, "deferred": 0, "failed": 0}
+    start = time.monotonic()
+
+    progress = tqdm(total=len(items), desc=desc)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while next_commit < len(items):
+            ## Keep the pool fed without running far ahead of the commit cursor.
+            while next_submit < len(items) and next_submit - next_commit < (
+                2 * max_workers
+            ):
+                future = executor.submit(job, items[next_submit])
+                pending[future] = next_submit
+                next_submit += 1
+
+            if next_commit not in results:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = pending.pop(future)
+                    try:
+                        results[idx] = ("ok", future.result())
+                    except DeferredJob:
+                        results[idx] = ("deferred", None)
+                    except Exception as e:
+                        print(f"\nFailed to process '{items[idx]}': {e}")
+                        results[idx] = ("failed", None)
+
+            while next_commit in results:
+                status, result = results.pop(next_commit)
+                item = items[next_commit]
+                if status != "ok":
+                    stats[status] += 1
+                elif result is None:
+                    stats["skipped"] += 1
+                else:
+                    try:
+                        commit(item, result)
+                        stats["committed"] += 1
+                    except Exception as e:
+                        print(f"\nFailed to store '{item}': {e}")
+                        stats["failed"] += 1
+                next_commit += 1
+                elapsed = time.monotonic() - start
+                progress.set_postfix(
+                    per_min=f"{60 * next_commit / max(elapsed, 1e-9):.1f}",
+                    failed=stats["failed"],
+                )
+                progress.update(1)
+    progress.close()
+
+    stats["elapsed"] = round(time.monotonic() - start, 1)
+    stats["items_per_min"] = round(60 * len(items) / max(stats["elapsed"], 1e-9), 1)
+    print(f"Processed {len(items)} items: {stats}")
+    return stats
@@ -143,8 +143,7 @@ html_template = """<!DOCTYPE html>
 
 def generate_data_card_html(arxiv_code: str):
     """Generate HTML for a data card."""
-    title_map = db.get_arxiv_title_dict()
-    title = title_map.get(arxiv_code, "")
+    title = db.get_arxiv_title(arxiv_code, "")
     script = db.get_arxiv_dashboard_script(arxiv_code, "script_content")
     summary = db.get_arxiv_dashboard_script(arxiv_code, "summary")
     if not script:
@@ -1,8 +1,18 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from psycopg2 import sql, InterfaceError, OperationalError
+from contextlib import contextmanager
+from typing import Tuple
 from datetime import datetime
 import streamlit as st
 import pandas as pd
-import psycopg2
+import numpy as np
+import threading
+import atexit
+import json
+import io
+import time
 import uuid
 import os
 
@@ -18,7 +28,215 @@ except:
     db_params = {**st.secrets["postgres"]}
 
 
-database_url = f"postgresql+psycopg2://{db_params['user']}:{db_params['password']}@{db_params['host']}:{db_params['port']}/{db_params['dbname']}"
+def make_database_url(params: dict) -> str:
+    """Build a SQLAlchemy URL from psycopg2-style connection params."""
+    return (
+        f"postgresql+psycopg2://{params['user']}:{params['password']}"
+        f"@{params['host']}:{params['port']}/{params['dbname']}"
+    )
+
+
+database_url = make_database_url(db_params)
+
+
+#################
+## CONNECTIONS ##
+#################
+
+pool_config = {
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10)),
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+}
+
+_engines = {}
+_pg_pools = {}
+_pool_lock = threading.Lock()
+_pool_stats = {
+    "sqlalchemy": {"checkouts": 0, "waits": 0, "wait_time": 0.0},
+    "psycopg2": {"checkouts": 0, "waits": 0, "wait_time": 0.0},
+}
+
+
+def _record_checkout(kind: str, wait_time: float, waited: bool):
+    """Accumulate checkout counters for a pool kind."""
+    with _pool_lock:
+        stats = _pool_stats[kind]
+        stats["checkouts"] += 1
+        stats["waits"] += int(waited)
+        stats["wait_time"] += wait_time
+
+
+class TimedQueuePool(QueuePool):
+    """SQLAlchemy QueuePool that records how long checkouts wait."""
+
+    def _do_get(self):
+        waited = self.checkedout() >= self.size() + pool_config["max_overflow"]
+        st_time = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_checkout("sqlalchemy", time.perf_counter() - st_time, waited)
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """Thread-safe psycopg2 pool that blocks instead of failing when exhausted,
+    recycles connections older than `recycle` seconds, and pings idle ones on
+    checkout (like SQLAlchemy's pre-ping) to replace any the server dropped."""
+
+    def __init__(self, minconn, maxconn, *args, timeout=30, recycle=1800, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        self._recycle = recycle
+        self._born = {}
+        self.checked_out = 0
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        st_time = time.perf_counter()
+        waited = not self._slots.acquire(blocking=False)
+        if waited and not self._slots.acquire(timeout=self._timeout):
+            raise PoolError("Timed out waiting for a pooled connection.")
+        _record_checkout("psycopg2", time.perf_counter() - st_time, waited)
+        try:
+            ## Every idle connection may be stale; after those, a new one is opened.
+            for _ in range(self.maxconn + 1):
+                conn = super().getconn(key)
+                now = time.monotonic()
+                born = self._born.get(id(conn))
+                if born is None:
+                    self._born[id(conn)] = now
+                    break
+                if now - born <= self._recycle and self._ping(conn):
+                    break
+                self._born.pop(id(conn), None)
+                super().putconn(conn, key, close=True)
+            else:
+                raise PoolError("Could not get a live pooled connection.")
+        except Exception:
+            self._slots.release()
+            raise
+        self.checked_out += 1
+        return conn
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        """Round-trip a trivial query; False if the connection is dead."""
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (OperationalError, InterfaceError):
+            return False
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            if close:
+                self._born.pop(id(conn), None)
+            super().putconn(conn, key, close)
+        finally:
+            self.checked_out -= 1
+            self._slots.release()
+
+
+def _params_key(params: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+
+def get_engine(params: dict = None):
+    """Get the process-wide pooled SQLAlchemy engine (one per database)."""
+    url = database_url if params is None else make_database_url(params)
+    engine = _engines.get(url)
+    if engine is None:
+        with _pool_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = create_engine(
+                    url,
+                    poolclass=TimedQueuePool,
+                    pool_pre_ping=True,
+                    **pool_config,
+                )
+                _engines[url] = engine
+    return engine
+
+
+def _get_pg_pool(params: dict) -> BlockingConnectionPool:
+    """Get the process-wide psycopg2 pool for a set of connection params."""
+    key = _params_key(params)
+    pg_pool = _pg_pools.get(key)
+    if pg_pool is None:
+        with _pool_lock:
+            pg_pool = _pg_pools.get(key)
+            if pg_pool is None:
+                pg_pool = BlockingConnectionPool(
+                    1,
+                    pool_config["pool_size"] + pool_config["max_overflow"],
+                    timeout=pool_config["pool_timeout"],
+                    recycle=pool_config["pool_recycle"],
+                    **params,
+                )
+                _pg_pools[key] = pg_pool
+    return pg_pool
+
+
+@contextmanager
+def get_pg_connection(params: dict = None):
+    """Borrow a pooled psycopg2 connection; commit on success, rollback on error."""
+    pg_pool = _get_pg_pool(db_params if params is None else params)
+    conn = pg_pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pg_pool.putconn(conn, close=bool(conn.closed))
+
+
+def get_pool_stats() -> dict:
+    """Snapshot of connection pool usage (checked-out, waits, wait time) for monitoring."""
+    with _pool_lock:
+        stats = {kind: dict(values) for kind, values in _pool_stats.items()}
+        engines = list(_engines.values())
+        pg_pools = list(_pg_pools.values())
+    stats["sqlalchemy"]["pools"] = len(engines)
+    stats["sqlalchemy"]["checked_out"] = sum(e.pool.checkedout() for e in engines)
+    stats["sqlalchemy"]["overflow"] = sum(max(e.pool.overflow(), 0) for e in engines)
+    stats["psycopg2"]["pools"] = len(pg_pools)
+    stats["psycopg2"]["checked_out"] = sum(p.checked_out for p in pg_pools)
+    for kind_stats in stats.values():
+        checkouts = max(kind_stats["checkouts"], 1)
+        kind_stats["avg_wait_ms"] = 1000 * kind_stats["wait_time"] / checkouts
+    return stats
+
+
+def close_pools():
+    """Log pool and bulk write stats, then dispose every pooled engine and
+    connection. Runs at interpreter exit, so every workflow stage, executor
+    and app process releases its connections."""
+    pool_stats = get_pool_stats()
+    if any(pool_stats[kind]["checkouts"] for kind in pool_stats):
+        print(f"DB pool stats: {pool_stats}")
+    bulk_write_stats = get_bulk_write_stats()
+    if bulk_write_stats:
+        print(f"DB bulk write stats: {bulk_write_stats}")
+    with _pool_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        for pg_pool in _pg_pools.values():
+            pg_pool.closeall()
+        _engines.clear()
+        _pg_pools.clear()
+
+
+atexit.register(close_pools)
 
 
 def list_to_pg_array(lst):
@@ -28,12 +246,39 @@ def list_to_pg_array(lst):
 
 
 def pg_array_to_list(array_str):
-    return array_str.strip("{}").split(",")
+    """Parse a one-dimensional PostgreSQL array literal into a list of strings
+    (quoted elements are unescaped, unquoted NULLs become None)."""
+    inner = array_str.strip()
+    if inner.startswith("{") and inner.endswith("}"):
+        inner = inner[1:-1]
+    if not inner:
+        return []
+    elements, buffer = [], []
+    quoted = in_quotes = escaped = False
+    for char in inner + ",":
+        if escaped:
+            buffer.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = True
+            in_quotes = not in_quotes
+        elif char == "," and not in_quotes:
+            element = "".join(buffer)
+            if not quoted:
+                element = element.strip()
+                element = None if element.upper() == "NULL" else element
+            elements.append(element)
+            buffer, quoted = [], False
+        else:
+            buffer.append(char)
+    return elements
 
 
 def log_error_db(error):
     """Log error in DB along with streamlit app state."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         error_id = str(uuid.uuid4())
         tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
@@ -57,7 +302,7 @@ def log_error_db(error):
 def log_qna_db(user_question, response):
     """Log Q&A in DB along with streamlit app state."""
     try:
-        engine = create_engine(database_url)
+        engine = get_engine()
         with engine.begin() as conn:
             qna_id = str(uuid.uuid4())
             tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
@@ -81,10 +326,26 @@ def log_qna_db(user_question, response):
     return True
 
 
+def get_recent_qna_logs(limit: int = 100) -> pd.DataFrame:
+    """Get the latest chat questions and responses, newest first."""
+    query = text(
+        """
+        SELECT user_question, response, tstp
+        FROM qna_logs
+        WHERE response IS NOT NULL
+        ORDER BY tstp DESC
+        LIMIT :limit;
+        """
+    )
+    with get_engine().begin() as conn:
+        result = conn.execute(query, {"limit": limit})
+        return pd.DataFrame(result.fetchall(), columns=result.keys())
+
+
 def log_visit(entrypoint: str):
     """Log user visit in DB."""
     try:
-        engine = create_engine(database_url)
+        engine = get_engine()
         with engine.begin() as conn:
             visit_id = str(uuid.uuid4())
             tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
@@ -109,7 +370,7 @@ def log_visit(entrypoint: str):
 
 def report_issue(arxiv_code, issue_type):
     """Report an issue in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         issue_id = str(uuid.uuid4())
         tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
@@ -134,7 +395,7 @@ def report_issue(arxiv_code, issue_type):
 
 def get_reported_non_llm_papers():
     """Get a list of non-LLM papers reported by users."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -152,7 +413,7 @@ def get_reported_non_llm_papers():
 
 def update_reported_status(arxiv_code, issue_type, resolved=True):
     """Update user-reported issue status in DB (resolved or not)."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -171,7 +432,7 @@ def update_reported_status(arxiv_code, issue_type, resolved=True):
 
 def insert_recursive_summary(arxiv_code, summary):
     """Insert data into recursive_summary table in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -188,7 +449,7 @@ def insert_recursive_summary(arxiv_code, summary):
 
 def insert_bullet_list_summary(arxiv_code, summary):
     """Insert data into bullet_list_summaries table in DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -207,15 +468,16 @@ def load_arxiv(arxiv_code: str = None):
     query = "SELECT * FROM arxiv_details"
     if arxiv_code:
         query += f" WHERE arxiv_code = '{arxiv_code}'"
-    conn = create_engine(database_url)
+    conn = get_engine()
     arxiv_df = pd.read_sql(query, conn)
+    arxiv_df.drop(columns=[LEXICAL_SEARCH_COLUMN], errors="ignore", inplace=True)
     arxiv_df.set_index("arxiv_code", inplace=True)
     return arxiv_df
 
 
 def load_summaries():
     query = "SELECT * FROM summaries;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     summaries_df = pd.read_sql(query, conn)
     summaries_df.set_index("arxiv_code", inplace=True)
     summaries_df.drop(columns=["tstp"], inplace=True)
@@ -224,7 +486,7 @@ def load_summaries():
 
 def load_recursive_summaries():
     query = "SELECT * FROM recursive_summaries;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     recursive_summaries_df = pd.read_sql(query, conn)
     recursive_summaries_df.set_index("arxiv_code", inplace=True)
     recursive_summaries_df.rename(
@@ -236,7 +498,7 @@ def load_recursive_summaries():
 
 def load_bullet_list_summaries():
     query = "SELECT * FROM bullet_list_summaries;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     bullet_list_summaries_df = pd.read_sql(query, conn)
     bullet_list_summaries_df.set_index("arxiv_code", inplace=True)
     bullet_list_summaries_df.rename(
@@ -248,7 +510,7 @@ def load_bullet_list_summaries():
 
 def load_summary_notes():
     query = "SELECT * FROM summary_notes;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     extended_summaries_df = pd.read_sql(query, conn)
     extended_summaries_df.set_index("arxiv_code", inplace=True)
     return extended_summaries_df
@@ -256,7 +518,7 @@ def load_summary_notes():
 
 def load_summary_markdown():
     query = "SELECT * FROM summary_markdown;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     markdown_summaries_df = pd.read_sql(query, conn)
     markdown_summaries_df.set_index("arxiv_code", inplace=True)
     markdown_summaries_df.rename(columns={"summary": "markdown_notes"}, inplace=True)
@@ -266,7 +528,7 @@ def load_summary_markdown():
 
 def load_topics():
     query = "SELECT * FROM topics;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     topics_df = pd.read_sql(query, conn)
     topics_df.set_index("arxiv_code", inplace=True)
     return topics_df
@@ -274,7 +536,7 @@ def load_topics():
 
 def load_similar_documents():
     query = "SELECT * FROM similar_documents;"
-    conn = create_engine(database_url)
+    conn = get_engine()
     similar_docs_df = pd.read_sql(query, conn)
     similar_docs_df.set_index("arxiv_code", inplace=True)
     similar_docs_df["similar_docs"] = similar_docs_df["similar_docs"].apply(
@@ -287,7 +549,7 @@ def load_citations(arxiv_code: str = None):
     query = "SELECT * FROM semantic_details"
     if arxiv_code:
         query += f" WHERE arxiv_code = '{arxiv_code}';"
-    conn = create_engine(database_url)
+    conn = get_engine()
     citations_df = pd.read_sql(query, conn)
     citations_df.set_index("arxiv_code", inplace=True)
     citations_df.drop(columns=["paper_id"], inplace=True)
@@ -298,7 +560,7 @@ def load_repositories(arxiv_code: str = None):
     query = "SELECT * FROM arxiv_repos"
     if arxiv_code:
         query += f" WHERE arxiv_code = '{arxiv_code}';"
-    conn = create_engine(database_url)
+    conn = get_engine()
     repos_df = pd.read_sql(query, conn)
     repos_df.set_index("arxiv_code", inplace=True)
     repos_df.rename(
@@ -318,7 +580,7 @@ def load_tweet_insights(arxiv_code: str = None, drop_rejected: bool = False):
     query = "SELECT * FROM tweet_reviews where tweet_type = 'insight_v1'"
     if arxiv_code:
         query += f" WHERE arxiv_code = '{arxiv_code}';"
-    conn = create_engine(database_url)
+    conn = get_engine()
     tweet_reviews_df = pd.read_sql(query, conn)
     tweet_reviews_df.set_index("arxiv_code", inplace=True)
     if drop_rejected:
@@ -329,72 +591,330 @@ def load_tweet_insights(arxiv_code: str = None, drop_rejected: bool = False):
     return tweet_reviews_df
 
 
-def get_arxiv_parent_chunk_ids(chunk_ids: list):
-    """Get (arxiv_code, parent_id) for a list of (arxiv_code, child_id) tuples."""
-    ## ToDo: Improve version param.
-    engine = create_engine(database_url)
-    with engine.begin() as conn:
-        # Prepare a list of conditions for matching pairs of arxiv_code and child_id
-        conditions = " OR ".join(
-            [
-                f"(arxiv_code = '{arxiv_code}' AND child_id = {child_id})"
-                for arxiv_code, child_id in chunk_ids
-            ]
+#####################
+## PAPERS SNAPSHOT ##
+#####################
+
+PAPERS_SNAPSHOT_VIEW = "papers_snapshot"
+PAPERS_SNAPSHOT_WATERMARKS_TABLE = "papers_snapshot_watermarks"
+
+
+def build_papers_query(code_filter: str = None) -> str:
+    """Denormalized papers query (one row per summarized paper). A `code_filter`
+    predicate on arxiv_code is pushed into every subquery, so each DISTINCT ON
+    only scans the matching rows."""
+    where = f"WHERE {code_filter}" if code_filter else ""
+    and_filter = f"AND {code_filter}" if code_filter else ""
+    return f"""
+    SELECT s.arxiv_code,
+           s.contribution_title, s.contribution_content,
+           s.takeaway_title, s.takeaway_content, s.takeaway_example,
+           s.category, s.novelty_score, s.novelty_analysis,
+           s.technical_score, s.technical_analysis,
+           s.enjoyable_score, s.enjoyable_analysis,
+           d.updated, d.published, d.title, d.summary, d.authors, d.arxiv_comment,
+           t.topic, t.dim1, t.dim2,
+           sd.venue, sd.tldr, sd.citation_count, sd.influential_citation_count,
+           rs.summary AS recursive_summary,
+           bl.summary AS bullet_list_summary,
+           sm.summary AS markdown_notes,
+           tw.review AS tweet_insight,
+           sim.similar_docs
+    FROM (SELECT DISTINCT ON (arxiv_code) * FROM summaries {where}
+          ORDER BY arxiv_code, tstp DESC) s
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) * FROM arxiv_details {where}
+               ORDER BY arxiv_code) d ON s.arxiv_code = d.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) * FROM topics {where}
+               ORDER BY arxiv_code) t ON s.arxiv_code = t.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) * FROM semantic_details {where}
+               ORDER BY arxiv_code) sd ON s.arxiv_code = sd.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) arxiv_code, summary FROM recursive_summaries
+               {where}
+               ORDER BY arxiv_code, tstp DESC) rs ON s.arxiv_code = rs.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) arxiv_code, summary FROM bullet_list_summaries
+               {where}
+               ORDER BY arxiv_code, tstp DESC) bl ON s.arxiv_code = bl.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) arxiv_code, summary FROM summary_markdown
+               {where}
+               ORDER BY arxiv_code, tstp DESC) sm ON s.arxiv_code = sm.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) arxiv_code, review FROM tweet_reviews
+               WHERE tweet_type = 'insight_v1' {and_filter}
+               ORDER BY arxiv_code, tstp DESC) tw ON s.arxiv_code = tw.arxiv_code
+    LEFT JOIN (SELECT DISTINCT ON (arxiv_code) * FROM similar_documents {where}
+               ORDER BY arxiv_code) sim ON s.arxiv_code = sim.arxiv_code
+"""
+
+
+papers_snapshot_query = build_papers_query()
+
+
+def create_papers_snapshot() -> bool:
+    """Create the denormalized papers materialized view (if missing).
+    Returns True if the view was created by this call."""
+    with get_engine().begin() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:name)"), {"name": PAPERS_SNAPSHOT_VIEW}
+        ).scalar()
+        if exists:
+            return False
+        conn.execute(
+            text(
+                f"CREATE MATERIALIZED VIEW {PAPERS_SNAPSHOT_VIEW} AS "
+                f"{papers_snapshot_query} WITH DATA;"
+            )
         )
+        ## Unique index is required for concurrent refreshes.
+        conn.execute(
+            text(
+                f"CREATE UNIQUE INDEX {PAPERS_SNAPSHOT_VIEW}_arxiv_code_idx "
+                f"ON {PAPERS_SNAPSHOT_VIEW} (arxiv_code);"
+            )
+        )
+    return True
+
+
+def refresh_papers_snapshot():
+    """Rebuild the papers materialized view without blocking app readers, and
+    record the table watermarks it reflects (plus the refresh time, under the
+    view's name, so running apps know to reload tables without a `tstp`)."""
+    ## Watermarks go first so rows written during the refresh are re-fetched.
+    watermarks = get_table_watermarks()
+    watermarks[PAPERS_SNAPSHOT_VIEW] = datetime.now()
+    if not create_papers_snapshot():
+        with get_engine().begin() as conn:
+            conn.execute(
+                text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {PAPERS_SNAPSHOT_VIEW};")
+            )
+    watermarks_df = pd.DataFrame(
+        {"table_name": list(watermarks.keys()), "tstp": list(watermarks.values())}
+    )
+    upload_df_to_db(
+        watermarks_df, PAPERS_SNAPSHOT_WATERMARKS_TABLE, db_params, if_exists="replace"
+    )
+    return True
+
+
+def get_papers_snapshot_watermarks() -> dict:
+    """Table watermarks as of the papers view's last refresh, keyed by table
+    (the view's own key holds the refresh time). Missing entries map to None."""
+    watermarks = {table: None for table in papers_delta_tables}
+    watermarks[PAPERS_SNAPSHOT_VIEW] = None
+    with get_engine().begin() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:name)"),
+            {"name": PAPERS_SNAPSHOT_WATERMARKS_TABLE},
+        ).scalar()
+        if exists:
+            rows = conn.execute(
+                text(
+                    f"SELECT table_name, tstp FROM {PAPERS_SNAPSHOT_WATERMARKS_TABLE};"
+                )
+            ).fetchall()
+            watermarks.update({row[0]: row[1] for row in rows if row[0] in watermarks})
+    return watermarks
+
+
+def get_papers_snapshot_refreshed_at():
+    """Time of the papers view's last recorded refresh (None if never recorded)."""
+    with get_engine().begin() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:name)"),
+            {"name": PAPERS_SNAPSHOT_WATERMARKS_TABLE},
+        ).scalar()
+        if not exists:
+            return None
+        return conn.execute(
+            text(
+                f"SELECT tstp FROM {PAPERS_SNAPSHOT_WATERMARKS_TABLE} "
+                "WHERE table_name = :name;"
+            ),
+            {"name": PAPERS_SNAPSHOT_VIEW},
+        ).scalar()
+
+
+def _format_papers_frame(papers_df: pd.DataFrame) -> pd.DataFrame:
+    papers_df.set_index("arxiv_code", inplace=True)
+    papers_df["similar_docs"] = papers_df["similar_docs"].apply(
+        lambda x: pg_array_to_list(x) if isinstance(x, str) else x
+    )
+    return papers_df
+
+
+def load_papers_snapshot():
+    """Load the fully joined papers frame from the materialized view in one query."""
+    query = f"SELECT * FROM {PAPERS_SNAPSHOT_VIEW};"
+    papers_df = pd.read_sql(query, get_engine())
+    return _format_papers_frame(papers_df)
+
+
+## Tables with a `tstp` column whose changes invalidate a paper's joined row.
+papers_delta_tables = [
+    "summaries",
+    "recursive_summaries",
+    "bullet_list_summaries",
+    "summary_markdown",
+    "tweet_reviews",
+]
+
+
+def get_table_watermarks(tables: list = papers_delta_tables) -> dict:
+    """Get the high-water mark (latest `tstp`) of each table in one query."""
+    query = " UNION ALL ".join(
+        [
+            f"SELECT '{table}' AS table_name, MAX(tstp) AS tstp FROM {table}"
+            for table in tables
+        ]
+    )
+    with get_engine().begin() as conn:
+        rows = conn.execute(text(query)).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def get_changed_arxiv_codes(watermarks: dict) -> list:
+    """Get arxiv codes with rows newer than the watermark of any tracked table."""
+    subqueries = []
+    params = {}
+    for idx, table in enumerate(papers_delta_tables):
+        tstp = watermarks.get(table)
+        if tstp is None:
+            subqueries.append(f"SELECT arxiv_code FROM {table}")
+        else:
+            subqueries.append(
+                f"SELECT arxiv_code FROM {table} WHERE tstp > :tstp_{idx}"
+            )
+            params[f"tstp_{idx}"] = tstp
+    if not subqueries:
+        return []
+    with get_engine().begin() as conn:
+        result = conn.execute(text(" UNION ".join(subqueries)), params)
+        return [row[0] for row in result.fetchall()]
+
+
+def get_codes_with_topics(arxiv_codes: list) -> list:
+    """Of the given arxiv codes, get those that have a topic assigned."""
+    query = text(
+        "SELECT DISTINCT arxiv_code FROM topics WHERE arxiv_code = ANY(:arxiv_codes);"
+    )
+    with get_engine().begin() as conn:
+        result = conn.execute(query, {"arxiv_codes": list(arxiv_codes)})
+        return [row[0] for row in result.fetchall()]
+
+
+def load_papers_by_code(arxiv_codes: list) -> pd.DataFrame:
+    """Load joined paper rows (same shape as the snapshot) for a set of arxiv codes,
+    straight from the base tables."""
+    query = text(build_papers_query("arxiv_code = ANY(:arxiv_codes)"))
+    papers_df = pd.read_sql(
+        query, get_engine(), params={"arxiv_codes": list(arxiv_codes)}
+    )
+    return _format_papers_frame(papers_df)
+
+
+## Chunk map version -> parent chunk table (see workflow/j0_doc_chunker.py).
+parent_chunk_tables = {
+    "10000_1000": "arxiv_large_parent_chunks",
+    "2000_200": "arxiv_parent_chunks",
+}
+
+
+def _unzip_chunk_ids(chunk_ids: list) -> dict:
+    """Split (arxiv_code, chunk_id) tuples into bindable parallel arrays."""
+    return {
+        "arxiv_codes": [str(arxiv_code) for arxiv_code, _ in chunk_ids],
+        "chunk_ids": [int(chunk_id) for _, chunk_id in chunk_ids],
+    }
+
+
+def get_arxiv_parent_chunk_ids(chunk_ids: list, version: str = "10000_1000"):
+    """Get (arxiv_code, parent_id) for a list of (arxiv_code, child_id) tuples."""
+    if len(chunk_ids) == 0:
+        return []
+    with get_engine().begin() as conn:
         query = text(
-            f"""
-            SELECT DISTINCT arxiv_code, parent_id
-            FROM arxiv_chunk_map
-            WHERE ({conditions})
-            AND version = '10000_1000';
---             AND version = '5000_500';
+            """
+            SELECT DISTINCT m.arxiv_code, m.parent_id
+            FROM unnest(CAST(:arxiv_codes AS text[]), CAST(:chunk_ids AS bigint[]))
+                 AS c(arxiv_code, child_id)
+            JOIN arxiv_chunk_map m
+              ON m.arxiv_code = c.arxiv_code AND m.child_id = c.child_id
+            WHERE m.version = :version;
             """
         )
-        result = conn.execute(query)
+        result = conn.execute(
+            query, {**_unzip_chunk_ids(chunk_ids), "version": version}
+        )
         parent_ids = result.fetchall()
     return parent_ids
 
 
 def get_arxiv_chunks(chunk_ids: list, source="child"):
     """Get chunks with metadata for a list of (arxiv_code, chunk_id) tuples."""
-    engine = create_engine(database_url)
+    if len(chunk_ids) == 0:
+        return pd.DataFrame()
     source_table = "arxiv_chunks" if source == "child" else "arxiv_parent_chunks"
-    with engine.begin() as conn:
-        # Prepare a list of conditions for matching pairs of arxiv_code and chunk_id
-        conditions = " OR ".join(
-            [
-                f"(p.arxiv_code = '{arxiv_code}' AND p.chunk_id = {chunk_id})"
-                for arxiv_code, chunk_id in chunk_ids
-            ]
+    with get_engine().begin() as conn:
+        query = text(
+            f"""
+            SELECT d.arxiv_code, d.title, d.published, s.citation_count, p.text
+            FROM unnest(CAST(:arxiv_codes AS text[]), CAST(:chunk_ids AS bigint[]))
+                 AS c(arxiv_code, chunk_id)
+            JOIN {source_table} p
+              ON p.arxiv_code = c.arxiv_code AND p.chunk_id = c.chunk_id
+            JOIN arxiv_details d ON p.arxiv_code = d.arxiv_code
+            JOIN semantic_details s ON p.arxiv_code = s.arxiv_code;
+            """
         )
+        result = conn.execute(query, _unzip_chunk_ids(chunk_ids))
+        chunks = result.fetchall()
+        chunks_df = pd.DataFrame(chunks)
+    return chunks_df
+
+
+def get_arxiv_parent_chunks(chunk_ids: list, version: str = "10000_1000"):
+    """Get parent chunks with metadata for a list of (arxiv_code, child_id) tuples,
+    mapping children to parents and fetching them in a single round trip."""
+    if len(chunk_ids) == 0:
+        return pd.DataFrame()
+    parent_table = parent_chunk_tables[version]
+    with get_engine().begin() as conn:
         query = text(
             f"""
             SELECT d.arxiv_code, d.title, d.published, s.citation_count, p.text
-            FROM {source_table} p , arxiv_details d, semantic_details s
-            WHERE p.arxiv_code = d.arxiv_code
-            AND p.arxiv_code = s.arxiv_code
-            AND ({conditions});
+            FROM (
+                SELECT DISTINCT m.arxiv_code, m.parent_id
+                FROM unnest(CAST(:arxiv_codes AS text[]), CAST(:chunk_ids AS bigint[]))
+                     AS c(arxiv_code, child_id)
+                JOIN arxiv_chunk_map m
+                  ON m.arxiv_code = c.arxiv_code AND m.child_id = c.child_id
+                WHERE m.version = :version
+            ) pm
+            JOIN {parent_table} p
+              ON p.arxiv_code = pm.arxiv_code AND p.chunk_id = pm.parent_id
+            JOIN arxiv_details d ON p.arxiv_code = d.arxiv_code
+            JOIN semantic_details s ON p.arxiv_code = s.arxiv_code;
             """
         )
-        result = conn.execute(query)
+        result = conn.execute(
+            query, {**_unzip_chunk_ids(chunk_ids), "version": version}
+        )
         chunks = result.fetchall()
         chunks_df = pd.DataFrame(chunks)
     return chunks_df
 
 
-def execute_query(query, db_params=db_params, limit=None):
-    """Upload a dictionary to a database."""
+def execute_query(query, db_params=db_params, limit=None, params=None):
+    """Run a read query (with optional bound parameters) and fetch all rows."""
     if limit and "LIMIT" not in query:
         query = query.strip().rstrip(";") + f" LIMIT {limit};"
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query, params)
             return cur.fetchall()
 
 
 def check_in_db(arxiv_code, db_params, table_name):
     """Check if an arxiv code is in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT * FROM {table_name} WHERE arxiv_code = '{arxiv_code}'")
             return bool(cur.rowcount)
@@ -402,7 +922,7 @@ def check_in_db(arxiv_code, db_params, table_name):
 
 def upload_to_db(data, db_params, table_name):
     """Upload a dictionary to a database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             columns = ", ".join(data.keys())
             placeholders = ", ".join(["%s"] * len(data))
@@ -414,53 +934,347 @@ def upload_to_db(data, db_params, table_name):
 
 def remove_from_db(arxiv_code, db_params, table_name):
     """Remove an entry from the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"DELETE FROM {table_name} WHERE arxiv_code = '{arxiv_code}'")
 
 
-def upload_df_to_db(
-    df: pd.DataFrame, table_name: str, params: dict, if_exists: str = "append"
-):
-    """Upload a dataframe to a database."""
-    db_url = (
-        f"postgresql+psycopg2://{params['user']}:{params['password']}"
-        f"@{params['host']}:{params['port']}/{params['dbname']}"
-    )
-    engine = create_engine(db_url)
-    df.to_sql(
-        table_name,
-        engine,
-        if_exists=if_exists,
-        index=False,
-        method="multi",
-        chunksize=10,
+#################
+## BULK WRITER ##
+#################
+
+COPY_CHUNK_ROWS = 50_000
+
+_bulk_write_stats = {}
+
+
+_PG_ARRAY_SPECIAL_CHARS = set('{}",\\')
+
+
+def _to_pg_array_literal(values) -> str:
+    """Render a python sequence as a PostgreSQL array literal, quoting elements
+    only where Postgres itself would (None and NaN become unquoted NULLs)."""
+    elements = []
+    for value in values:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            elements.append("NULL")
+            continue
+        value = str(value)
+        if (
+            value == ""
+            or value.upper() == "NULL"
+            or any(c in _PG_ARRAY_SPECIAL_CHARS or c.isspace() for c in value)
+        ):
+            value = value.replace("\\", "\\\\").replace('"', '\\"')
+            value = f'"{value}"'
+        elements.append(value)
+    return "{" + ",".join(elements) + "}"
+
+
+def _to_copy_value(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return _to_pg_array_literal(value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def _prepare_copy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Make a frame CSV-safe for COPY (arrays, JSON and integral floats)."""
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if series.dtype == object:
+            df[col] = series.map(_to_copy_value)
+        elif pd.api.types.is_float_dtype(series):
+            ## Integer columns with NaNs arrive as floats ("1.0" breaks COPY).
+            non_null = series.dropna()
+            if (
+                len(non_null) > 0
+                and (non_null == non_null.round()).all()
+                and (non_null.abs() < 2**53).all()
+            ):
+                df[col] = series.astype("Int64")
+    return df
+
+
+def _copy_frame(cur, df: pd.DataFrame, table_name: str) -> int:
+    """Stream a frame into a table with COPY FROM STDIN; returns characters sent."""
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+        sql.Identifier(table_name),
+        sql.SQL(", ").join(map(sql.Identifier, df.columns)),
     )
+    total_chars = 0
+    for st_row in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        df.iloc[st_row : st_row + COPY_CHUNK_ROWS].to_csv(
+            buffer, index=False, header=False, na_rep="\\N"
+        )
+        total_chars += buffer.tell()
+        buffer.seek(0)
+        cur.copy_expert(copy_sql, buffer)
+    return total_chars
 
-    ## Commit.
-    with psycopg2.connect(**params) as conn:
-        with conn.cursor() as cur:
-            cur.execute("COMMIT")
 
-    ## Close.
-    engine.dispose()
+def _record_bulk_write(table_name: str, rows: int, nchars: int, seconds: float):
+    with _pool_lock:
+        stats = _bulk_write_stats.setdefault(
+            table_name, {"writes": 0, "rows": 0, "chars": 0, "seconds": 0.0}
+        )
+        stats["writes"] += 1
+        stats["rows"] += rows
+        stats["chars"] += nchars
+        stats["seconds"] += seconds
+
+
+def get_bulk_write_stats() -> dict:
+    """Per-table bulk write throughput (rows, characters, seconds, rows/sec)."""
+    with _pool_lock:
+        stats = {table: dict(values) for table, values in _bulk_write_stats.items()}
+    for values in stats.values():
+        values["rows_per_sec"] = values["rows"] / max(values["seconds"], 1e-9)
+    return stats
+
+
+def _frame_column_types(df: pd.DataFrame, table_name: str, params: dict) -> dict:
+    """Map each frame column to the SQL type `to_sql` would create it with."""
+    engine = get_engine(params)
+    with pd.io.sql.pandasSQL_builder(engine) as pandas_sql:
+        table = pd.io.sql.SQLTable(
+            table_name, pandas_sql, frame=df.head(0), index=False
+        ).table
+    return {
+        column.name: column.type.compile(dialect=engine.dialect)
+        for column in table.columns
+    }
+
 
+def _sync_table_columns(cur, df: pd.DataFrame, table_name: str, params: dict):
+    """Alter a table so its columns match the frame's (added columns take the
+    frame's types, columns missing from the frame are dropped)."""
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        """,
+        (table_name,),
+    )
+    table_columns = [row[0] for row in cur.fetchall()]
+    new_columns = [col for col in df.columns if col not in table_columns]
+    old_columns = [col for col in table_columns if col not in df.columns]
+    if new_columns:
+        column_types = _frame_column_types(df[new_columns], table_name, params)
+        for col in new_columns:
+            cur.execute(
+                sql.SQL("ALTER TABLE {} ADD COLUMN {} {}").format(
+                    sql.Identifier(table_name),
+                    sql.Identifier(col),
+                    sql.SQL(column_types[col]),
+                )
+            )
+    for col in old_columns:
+        cur.execute(
+            sql.SQL("ALTER TABLE {} DROP COLUMN {}").format(
+                sql.Identifier(table_name), sql.Identifier(col)
+            )
+        )
+
+
+def upload_df_to_db(
+    df: pd.DataFrame,
+    table_name: str,
+    params: dict,
+    if_exists: str = "append",
+    upsert_keys: list = None,
+):
+    """Upload a dataframe to a database via COPY, in a single transaction.
+    - if_exists="append": add rows (table is created from the frame if missing).
+    - if_exists="replace": truncate and reload the table, altering its columns to
+      match the frame (dependent views are kept, so dropping a column they read fails).
+    - upsert_keys: rows matching on these columns are replaced (staging table)."""
+    if if_exists not in ("append", "replace"):
+        raise ValueError(f"Unsupported if_exists policy: {if_exists}")
+    st_time = time.perf_counter()
+    copy_df = _prepare_copy_frame(df)
+    with get_pg_connection(params) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", (table_name,))
+            if cur.fetchone()[0] is None:
+                cur.execute(
+                    pd.io.sql.get_schema(df.head(0), table_name, con=get_engine(params))
+                )
+            elif if_exists == "replace":
+                _sync_table_columns(cur, df, table_name, params)
+                cur.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(table_name)))
+
+            if upsert_keys and if_exists == "append":
+                staging_name = f"_staging_{table_name}"
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    ).format(sql.Identifier(staging_name), sql.Identifier(table_name))
+                )
+                nchars = _copy_frame(cur, copy_df, staging_name)
+                key_match = sql.SQL(" AND ").join(
+                    sql.SQL("t.{key} = s.{key}").format(key=sql.Identifier(key))
+                    for key in upsert_keys
+                )
+                columns = sql.SQL(", ").join(map(sql.Identifier, copy_df.columns))
+                cur.execute(
+                    sql.SQL("DELETE FROM {} t USING {} s WHERE {}").format(
+                        sql.Identifier(table_name),
+                        sql.Identifier(staging_name),
+                        key_match,
+                    )
+                )
+                cur.execute(
+                    sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {}").format(
+                        sql.Identifier(table_name),
+                        columns,
+                        columns,
+                        sql.Identifier(staging_name),
+                    )
+                )
+            else:
+                nchars = _copy_frame(cur, copy_df, table_name)
+
+    _record_bulk_write(table_name, len(df), nchars, time.perf_counter() - st_time)
     return True
 
 
 def get_arxiv_id_list(db_params=db_params, table_name="arxiv_details"):
     """Get a list of all arxiv codes in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT DISTINCT arxiv_code FROM {table_name}")
             return [row[0] for row in cur.fetchall()]
 
 
+def pending_codes(
+    source_table: str = None,
+    target_table: str = None,
+    order: str = "desc",
+    limit: int = None,
+    source_codes: list = None,
+    page_size: int = 500,
+    params: dict = None,
+):
+    """Stream arxiv codes present in `source_table` (or `source_codes`) but
+    missing from `target_table`, via an indexed NOT EXISTS anti-join.
+    Codes are fetched in keyset-paginated pages, so no connection is held
+    while the caller processes them."""
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Unsupported order: {order}")
+    if source_codes is not None:
+        source = sql.SQL("unnest(%(source_codes)s::text[]) AS s(arxiv_code)")
+    else:
+        source = sql.SQL("{} s").format(sql.Identifier(source_table))
+    keyset = sql.SQL(
+        "s.arxiv_code < %(last)s" if order == "desc" else "s.arxiv_code > %(last)s"
+    )
+    query = sql.SQL(
+        """
+        SELECT DISTINCT s.arxiv_code
+        FROM {source}
+        WHERE s.arxiv_code IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM {target} t WHERE t.arxiv_code = s.arxiv_code
+        )
+        AND (%(last)s IS NULL OR {keyset})
+        ORDER BY s.arxiv_code {order}
+        LIMIT %(page_size)s
+        """
+    ).format(
+        source=source,
+        target=sql.Identifier(target_table),
+        keyset=keyset,
+        order=sql.SQL(order.upper()),
+    )
+
+    last = None
+    n_yielded = 0
+    while limit is None or n_yielded < limit:
+        fetch_size = page_size if limit is None else min(page_size, limit - n_yielded)
+        with get_pg_connection(params) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    query,
+                    {
+                        "source_codes": source_codes,
+                        "last": last,
+                        "page_size": fetch_size,
+                    },
+                )
+                page = [row[0] for row in cur.fetchall()]
+        for arxiv_code in page:
+            yield arxiv_code
+        n_yielded += len(page)
+        if len(page) < fetch_size:
+            break
+        last = page[-1]
+
+
+def create_arxiv_code_indexes(tables: list, params: dict = None):
+    """Create (if missing) the arxiv_code indexes used by pending-work anti-joins."""
+    with get_pg_connection(params) as conn:
+        with conn.cursor() as cur:
+            for table in tables:
+                cur.execute(
+                    sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (arxiv_code)").format(
+                        sql.Identifier(f"{table}_arxiv_code_idx"),
+                        sql.Identifier(table),
+                    )
+                )
+    return True
+
+
+## Stored (generated) tsvector columns, GIN-indexed, backing hybrid chat search.
+LEXICAL_SEARCH_COLUMN = "search_tsv"
+lexical_search_columns = {
+    "arxiv_details": "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(summary, ''))",
+    "arxiv_chunks": "to_tsvector('english', coalesce(text, ''))",
+}
+
+
+def create_lexical_search_indexes(params: dict = None):
+    """Add (if missing) the generated full-text columns used by hybrid search,
+    with their GIN indexes."""
+    with get_pg_connection(params) as conn:
+        with conn.cursor() as cur:
+            for table, expression in lexical_search_columns.items():
+                cur.execute(
+                    sql.SQL(
+                        "ALTER TABLE {} ADD COLUMN IF NOT EXISTS {} tsvector "
+                        "GENERATED ALWAYS AS ({}) STORED"
+                    ).format(
+                        sql.Identifier(table),
+                        sql.Identifier(LEXICAL_SEARCH_COLUMN),
+                        sql.SQL(expression),
+                    )
+                )
+                cur.execute(
+                    sql.SQL(
+                        "CREATE INDEX IF NOT EXISTS {} ON {} USING GIN ({})"
+                    ).format(
+                        sql.Identifier(f"{table}_{LEXICAL_SEARCH_COLUMN}_idx"),
+                        sql.Identifier(table),
+                        sql.Identifier(LEXICAL_SEARCH_COLUMN),
+                    )
+                )
+                ## Superseded expression index.
+                cur.execute(
+                    sql.SQL("DROP INDEX IF EXISTS {}").format(
+                        sql.Identifier(f"{table}_fts_idx")
+                    )
+                )
+    return True
+
+
 def get_latest_tstp(
     db_params=db_params, table_name="arxiv_details", extra_condition=""
 ):
     """Get the latest timestamp in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT MAX(tstp) FROM {table_name} {extra_condition};")
             return cur.fetchone()[0]
@@ -468,14 +1282,14 @@ def get_latest_tstp(
 
 def get_max_table_date(db_params, table_name, date_col="date"):
     """Get the max date in a table."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(f"SELECT MAX({date_col}) FROM {table_name};")
             return cur.fetchone()[0]
 
 
 def get_arxiv_id_embeddings(collection_name, db_params=db_params):
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
@@ -488,9 +1302,81 @@ def get_arxiv_id_embeddings(collection_name, db_params=db_params):
             return [row[0] for row in cur.fetchall()]
 
 
+def get_collection_embeddings(
+    collection_name: str, arxiv_codes: list, page_size: int = 1000
+) -> Tuple[list, np.ndarray]:
+    """Fetch (arxiv_codes, float32 embedding matrix) for the given codes of a
+    pgvector collection, paging through the code list."""
+    query = text(
+        """
+        SELECT l.cmetadata ->> 'arxiv_code' AS arxiv_code, l.embedding::text
+        FROM langchain_pg_embedding l
+        JOIN langchain_pg_collection c ON l.collection_id = c.uuid
+        WHERE c.name = :collection_name
+        AND l.cmetadata ->> 'arxiv_code' = ANY(:arxiv_codes);
+        """
+    )
+    codes, vectors, seen = [], [], set()
+    arxiv_codes = list(arxiv_codes)
+    with get_engine().begin() as conn:
+        for i in range(0, len(arxiv_codes), page_size):
+            rows = conn.execute(
+                query,
+                {
+                    "collection_name": collection_name,
+                    "arxiv_codes": arxiv_codes[i : i + page_size],
+                },
+            ).fetchall()
+            for arxiv_code, embedding in rows:
+                if arxiv_code in seen:
+                    continue
+                seen.add(arxiv_code)
+                codes.append(arxiv_code)
+                vectors.append(np.array(json.loads(embedding), dtype=np.float32))
+    if not vectors:
+        return [], np.empty((0, 0), dtype=np.float32)
+    return codes, np.vstack(vectors)
+
+
+def get_search_metadata() -> pd.DataFrame:
+    """Filterable fields (title, published, citations) of searchable papers."""
+    query = text(
+        """
+        SELECT DISTINCT a.arxiv_code, a.title, a.published, s.citation_count
+        FROM arxiv_details a
+        JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+        JOIN topics t ON a.arxiv_code = t.arxiv_code;
+        """
+    )
+    with get_engine().begin() as conn:
+        result = conn.execute(query)
+        metadata_df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    metadata_df["published"] = pd.to_datetime(metadata_df["published"])
+    metadata_df = metadata_df.drop_duplicates("arxiv_code")
+    return metadata_df.set_index("arxiv_code")
+
+
+def get_search_documents(arxiv_codes: list) -> list:
+    """Fetch search result rows (code, title, published, citations, abstract)
+    for a list of papers, in the order given."""
+    query = text(
+        """
+        SELECT a.arxiv_code, a.title, a.published, s.citation_count,
+               a.summary AS abstract
+        FROM arxiv_details a
+        JOIN semantic_details s ON a.arxiv_code = s.arxiv_code
+        WHERE a.arxiv_code = ANY(:arxiv_codes);
+        """
+    )
+    with get_engine().begin() as conn:
+        rows = conn.execute(query, {"arxiv_codes": list(arxiv_codes)}).fetchall()
+    rows_map = {row[0]: tuple(row) for row in rows}
+    return [rows_map[c] for c in arxiv_codes if c in rows_map]
+
+
 def get_arxiv_title_dict(db_params=db_params):
     """Get a list of all arxiv titles in the database."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
@@ -503,9 +1389,121 @@ def get_arxiv_title_dict(db_params=db_params):
             return title_map
 
 
+#################
+## TITLE INDEX ##
+#################
+
+
+class ArxivTitleIndex:
+    """In-process cache of arxiv_details titles and basic metadata, with point
+    lookups by code. The cache is invalidated when a checksum of the table's
+    codes and titles changes, checked at most every `check_interval` seconds.
+    Codes without a title are remembered as missing for the same interval."""
+
+    def __init__(self, check_interval: int = 60):
+        self.check_interval = check_interval
+        self._records = {}
+        self._missing = {}
+        self._version = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _table_version(self):
+        with get_engine().begin() as conn:
+            query = text(
+                """
+                SELECT COUNT(*), SUM(hashtext(arxiv_code || ':' || title))
+                FROM arxiv_details
+                WHERE title IS NOT NULL;
+                """
+            )
+            return tuple(conn.execute(query).fetchone())
+
+    def _load_all(self) -> dict:
+        with get_engine().begin() as conn:
+            query = text(
+                """
+                SELECT arxiv_code, title, published, authors
+                FROM arxiv_details
+                WHERE title IS NOT NULL;
+                """
+            )
+            rows = conn.execute(query).fetchall()
+        return {row[0]: dict(row._mapping) for row in rows}
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._last_check < self.check_interval:
+            return
+        version = self._table_version()
+        if version != self._version or not self._records:
+            self._records = self._load_all()
+            self._missing = {}
+            self._version = version
+        self._last_check = now
+
+    def invalidate(self):
+        """Force a reload on the next lookup."""
+        with self._lock:
+            self._version = None
+            self._records = {}
+            self._missing = {}
+
+    def get(self, arxiv_code: str) -> dict:
+        """Get title/metadata for a single paper (None if unknown)."""
+        with self._lock:
+            self._ensure_fresh()
+            record = self._records.get(arxiv_code)
+            missing_since = self._missing.get(arxiv_code)
+        if record is not None:
+            return record
+        if (
+            missing_since is not None
+            and time.monotonic() - missing_since < self.check_interval
+        ):
+            return None
+
+        ## Rows added since the last version check.
+        with get_engine().begin() as conn:
+            query = text(
+                """
+                SELECT arxiv_code, title, published, authors
+                FROM arxiv_details
+                WHERE arxiv_code = :arxiv_code
+                AND title IS NOT NULL;
+                """
+            )
+            row = conn.execute(query, {"arxiv_code": arxiv_code}).fetchone()
+        if row is None:
+            with self._lock:
+                self._missing[arxiv_code] = time.monotonic()
+            return None
+        record = dict(row._mapping)
+        with self._lock:
+            self._records[arxiv_code] = record
+        return record
+
+    def get_title(self, arxiv_code: str, default: str = None) -> str:
+        record = self.get(arxiv_code)
+        return record["title"] if record else default
+
+    def get_title_dict(self) -> dict:
+        with self._lock:
+            self._ensure_fresh()
+            return {code: record["title"] for code, record in self._records.items()}
+
+
+title_index = ArxivTitleIndex()
+
+
+def get_arxiv_title(arxiv_code: str, default: str = None) -> str:
+    """Get the title of a paper from the cached title index."""
+    return title_index.get_title(arxiv_code, default)
+
+
 def get_topic_embedding_dist(db_params=db_params):
     """Get mean and stdDev for topic embeddings (dim1 & dim2)."""
-    with psycopg2.connect(**db_params) as conn:
+    with get_pg_connection(db_params) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -523,7 +1521,7 @@ def get_topic_embedding_dist(db_params=db_params):
 
 def get_extended_content(arxiv_code: str):
     """Get extended content for a given arxiv code."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -547,7 +1545,7 @@ def get_extended_content(arxiv_code: str):
 
 def get_weekly_summary_inputs(date: str):
     """Get weekly summaries for a given date (from last monday to next sunday)."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     ## Find last monday if not monday.
     date_st = pd.to_datetime(date).date() - pd.Timedelta(
         days=pd.to_datetime(date).weekday()
@@ -578,9 +1576,50 @@ def get_weekly_summary_inputs(date: str):
     return summaries_df
 
 
+def get_weekly_counts(
+    start_date: str = None, end_date: str = None, by_topic: bool = False
+) -> pd.DataFrame:
+    """Count reviewed papers per week (Monday start), optionally per topic, for
+    all weeks overlapping [start_date, end_date], in one aggregate query."""
+    group_cols = ["week_start", "topic"] if by_topic else ["week_start"]
+    conditions = []
+    params = {}
+    if start_date:
+        conditions.append(
+            "AND date_trunc('week', d.published)::date >= date_trunc('week', CAST(:start_date AS date))::date"
+        )
+        params["start_date"] = str(start_date)
+    if end_date:
+        conditions.append(
+            "AND date_trunc('week', d.published)::date <= date_trunc('week', CAST(:end_date AS date))::date"
+        )
+        params["end_date"] = str(end_date)
+    query = text(
+        f"""
+        SELECT date_trunc('week', d.published)::date AS week_start,
+               {"t.topic," if by_topic else ""}
+               COUNT(DISTINCT s.arxiv_code) AS paper_count
+        FROM summaries s
+        JOIN arxiv_details d ON s.arxiv_code = d.arxiv_code
+        JOIN topics t ON s.arxiv_code = t.arxiv_code
+        WHERE EXISTS (SELECT 1 FROM summary_notes sn WHERE sn.arxiv_code = s.arxiv_code)
+        {" ".join(conditions)}
+        GROUP BY {", ".join(group_cols)}
+        ORDER BY {", ".join(group_cols)};
+        """
+    )
+    with get_engine().begin() as conn:
+        result = conn.execute(query, params)
+        counts_df = pd.DataFrame(
+            result.fetchall(), columns=group_cols + ["paper_count"]
+        )
+    counts_df["week_start"] = pd.to_datetime(counts_df["week_start"])
+    return counts_df
+
+
 def check_weekly_summary_exists(date_str: str):
     """Check if weekly summary exists for a given date."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -592,13 +1631,12 @@ def check_weekly_summary_exists(date_str: str):
         result = conn.execute(query)
         count = result.fetchone()[0]
 
-    engine.dispose()
     return count > 0
 
 
 def get_weekly_content(date_str: str, content_type: str = "content"):
     """Get weekly content for a given date."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -610,7 +1648,6 @@ def get_weekly_content(date_str: str, content_type: str = "content"):
         result = conn.execute(query)
         content = result.fetchone()[0]
 
-    engine.dispose()
     return content
 
 
@@ -620,7 +1657,7 @@ from sqlalchemy import create_engine, text
 
 def get_weekly_repos(date_str):
     """Get weekly repos for a given date."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     start_date = (
         pd.to_datetime(date_str).date()
         - pd.Timedelta(days=pd.to_datetime(date_str).weekday())
@@ -652,7 +1689,7 @@ def get_weekly_repos(date_str):
 
 def get_weekly_summary_old(date_str: str):
     """Get weekly summary for a given date (old approach)."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     date_str = (
         pd.to_datetime(date_str).date()
         - pd.Timedelta(days=pd.to_datetime(date_str).weekday())
@@ -669,13 +1706,12 @@ def get_weekly_summary_old(date_str: str):
         review = result.fetchone()
         review = review[0] if review else None
 
-    engine.dispose()
     return review
 
 
 def get_extended_notes(arxiv_code: str, level=None, expected_tokens=None):
     """Get extended summary for a given arxiv code."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         if level:
             query = text(
@@ -706,13 +1742,41 @@ def get_extended_notes(arxiv_code: str, level=None, expected_tokens=None):
             )
         result = conn.execute(query)
         summary = result.fetchone()
-    engine.dispose()
     return summary[2]
 
 
+def get_extended_notes_batch(
+    arxiv_codes: list, expected_tokens: int = None, page_size: int = 500
+) -> dict:
+    """Get extended summaries for many arxiv codes at once (best-matching level
+    per paper), querying in pages of `page_size` codes."""
+    if expected_tokens:
+        order_by = "ABS(tokens - :expected_tokens) ASC"
+    else:
+        order_by = "level DESC"
+    query = text(
+        f"""
+        SELECT DISTINCT ON (arxiv_code) arxiv_code, summary
+        FROM summary_notes
+        WHERE arxiv_code = ANY(:arxiv_codes)
+        ORDER BY arxiv_code, {order_by};
+        """
+    )
+    arxiv_codes = list(arxiv_codes)
+    notes = {}
+    with get_engine().connect() as conn:
+        for st_idx in range(0, len(arxiv_codes), page_size):
+            params = {"arxiv_codes": arxiv_codes[st_idx : st_idx + page_size]}
+            if expected_tokens:
+                params["expected_tokens"] = expected_tokens
+            result = conn.execute(query, params)
+            notes.update({row[0]: row[1] for row in result})
+    return notes
+
+
 def get_recursive_summary(arxiv_code: str) -> str:
     """Get recursive summary for a given arxiv code."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -723,14 +1787,13 @@ def get_recursive_summary(arxiv_code: str) -> str:
         )
         result = conn.execute(query)
         summary = result.fetchone()
-    engine.dispose()
     result = summary[1] if summary else None
     return result
 
 
 def insert_tweet_review(arxiv_code, review, tstp, tweet_type, rejected=False):
     """Insert tweet review into the database."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             """
@@ -761,7 +1824,7 @@ def save_arxiv_dashboard_script(
     arxiv_code: str, summary: str, scratchpad: str, script: str
 ) -> bool:
     """Insert a new arxiv dashboard script into the DB."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     tstp = pd.to_datetime("now").strftime("%Y-%m-%d %H:%M:%S")
     with engine.begin() as conn:
         query = text(
@@ -785,7 +1848,7 @@ def save_arxiv_dashboard_script(
 
 def get_arxiv_dashboard_script(arxiv_code: str, sel_col: str = "script_content") -> str:
     """Query DB to get script for the arxiv dashboard."""
-    engine = create_engine(database_url)
+    engine = get_engine()
     with engine.begin() as conn:
         query = text(
             f"""
@@ -797,5 +1860,4 @@ def get_arxiv_dashboard_script(arxiv_code: str, sel_col: str = "script_content")
         result = conn.execute(query)
         row = result.fetchone()
         script = row[0] if row else None
-    engine.dispose()
     return script
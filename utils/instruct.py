@@ -3,6 +3,218 @@ from pydantic import BaseModel
 import instructor
 from anthropic import Anthropic
 from openai import OpenAI
+import anthropic
+import openai
+from pydantic import ValidationError
+import threading
+import hashlib
+import sqlite3
+import httpx
+import json
+import time
+import os
+
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt
+from utils.concurrency import get_limiter, DeferredJob, LLM_MAX_CONNECTIONS
+
+#############
+## CLIENTS ##
+#############
+
+## Keep-alive HTTP pool per provider; size it to the number of concurrent calls.
+llm_pool_config = {
+    "max_connections": LLM_MAX_CONNECTIONS,
+    "max_keepalive_connections": int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", 16)),
+    "keepalive_expiry": float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60)),
+}
+
+_clients = {}
+_instructor_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _make_http_client() -> httpx.Client:
+    return httpx.Client(
+        limits=httpx.Limits(**llm_pool_config),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
+
+
+def get_llm_client(provider: str, **client_kwargs):
+    """Process-wide API client per provider and config, sharing a pooled
+    keep-alive HTTP connection pool across calls and threads. SDK retries are
+    off by default: `run_instructor_query` retries (and backs off) itself."""
+    client_kwargs = {"max_retries": 0, **client_kwargs}
+    key = (provider, tuple(sorted(client_kwargs.items())))
+    with _clients_lock:
+        if key not in _clients:
+            if provider == "Anthropic":
+                client = Anthropic(http_client=_make_http_client(), **client_kwargs)
+            elif provider == "OpenAI":
+                client = OpenAI(http_client=_make_http_client(), **client_kwargs)
+            else:
+                raise ValueError(f"Unsupported model type: {provider}")
+            _clients[key] = client
+        return _clients[key]
+
+
+def get_instructor_client(client):
+    """Instructor wrapper of an API client, created once per client."""
+    with _clients_lock:
+        if id(client) not in _instructor_clients:
+            if isinstance(client, Anthropic):
+                wrapped = instructor.from_anthropic(client)
+            else:
+                wrapped = instructor.from_openai(client)
+            ## Keep a reference to the client so its id is never reused.
+            _instructor_clients[id(client)] = (client, wrapped)
+        return _instructor_clients[id(client)][1]
+
+
+####################
+## RESPONSE CACHE ##
+####################
+
+
+class LLMResponseCache:
+    """Persistent content-addressed cache of LLM completions in SQLite, keyed by
+    a hash of (provider, model, system prompt, user prompt, response schema,
+    temperature). Least recently used entries are evicted once the stored
+    responses exceed `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _get_conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    llm_model TEXT,
+                    response TEXT,
+                    size INTEGER,
+                    last_used REAL
+                );
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(
+        provider, llm_model, system_message, user_message, model, temperature
+    ) -> str:
+        payload = json.dumps(
+            {
+                "provider": provider,
+                "llm_model": llm_model,
+                "system_message": system_message,
+                "user_message": user_message,
+                "schema": model.model_json_schema() if model is not None else None,
+                "temperature": temperature,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, model: Optional[Type[BaseModel]] = None):
+        """Return the cached response (validated into `model` if given), or None."""
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                row = conn.execute(
+                    "SELECT response FROM llm_responses WHERE key = ?;", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute(
+                    "UPDATE llm_responses SET last_used = ? WHERE key = ?;",
+                    (time.time(), key),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"LLM cache read failed: {e}")
+            return None
+
+        if model is None:
+            return row[0]
+        try:
+            return model.model_validate_json(row[0])
+        except ValidationError:
+            ## Schema changed since the response was stored; treat as a miss.
+            return None
+
+    def put(self, key: str, llm_model: str, response):
+        if isinstance(response, BaseModel):
+            response = response.model_dump_json()
+        size = len(response.encode("utf-8"))
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?);",
+                    (key, llm_model, response, size, time.time()),
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses;")
+        overflow = total.fetchone()[0] - self.max_bytes
+        if overflow <= 0:
+            return
+        rows = conn.execute(
+            "SELECT key, size FROM llm_responses ORDER BY last_used ASC;"
+        ).fetchall()
+        stale_keys = []
+        for key, size in rows:
+            if overflow <= 0:
+                break
+            stale_keys.append((key,))
+            overflow -= size
+        conn.executemany("DELETE FROM llm_responses WHERE key = ?;", stale_keys)
+
+
+## Opt-in: set LLM_CACHE_PATH to enable; LLM_CACHE_BYPASS=1 skips reads (and
+## refreshes entries) without disabling writes.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0").lower() in ("1", "true")
+response_cache = (
+    LLMResponseCache(
+        LLM_CACHE_PATH, max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", 512)) * 1024**2
+    )
+    if LLM_CACHE_PATH
+    else None
+)
+
+
+## Set by `utils.batch.spooling()`; uncached requests are spooled, not sent.
+batch_spool = None
+
+RATE_LIMIT_RETRIES = 5
+TRANSIENT_RETRIES = 2
+RATE_LIMIT_ERRORS = (openai.RateLimitError, anthropic.RateLimitError)
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    anthropic.APIConnectionError,
+    anthropic.InternalServerError,
+)
+
+
+def estimate_request_tokens(
+    system_message: str, user_message: str, completion_tokens: int = 1024
+) -> int:
+    """Rough token budget of a request (~4 characters per prompt token)."""
+    return (len(system_message) + len(user_message)) // 4 + completion_tokens
 
 
 def run_instructor_query(
@@ -11,25 +223,103 @@ def run_instructor_query(
     model: Optional[Type[BaseModel]] = None,
     llm_model: str = "gpt-4o",
     temperature: float = 0.5,
+    stream: bool = False,
+    use_cache: bool = True,
+    interactive: bool = False,
 ):
-    """Run a query with the instructor API and get a structured response."""
+    """Run a query with the instructor API and get a structured response.
+    With `stream=True` (plain text only) returns a generator of text chunks.
+    Completed responses go through the response cache when it is enabled;
+    `use_cache=False` bypasses it for a single call. Workflow calls wait on the
+    provider's rate budgets and back off on 429s; `interactive` calls (the app)
+    skip the budgets and fail fast on a 429 instead of pausing."""
+    if stream and model is not None:
+        raise ValueError("Streaming is only supported for plain text responses.")
+
     model_type = "OpenAI" if "gpt" in llm_model else "Anthropic"
-    if model_type == "Anthropic":
-        client = Anthropic()
-        response = create_anthropic_message(
-            client, system_message, user_message, model, llm_model, temperature
+    cache_key = None
+    if response_cache is not None and use_cache and not stream:
+        cache_key = response_cache.make_key(
+            model_type, llm_model, system_message, user_message, model, temperature
         )
-    elif model_type == "OpenAI":
-        client = OpenAI()
-        response = create_openai_message(
-            client, system_message, user_message, model, llm_model, temperature
+        if not LLM_CACHE_BYPASS or batch_spool is not None:
+            cached_response = response_cache.get(cache_key, model)
+            if cached_response is not None:
+                return cached_response
+
+    ## Batch mode: queue the request for an offline batch instead of calling out.
+    if batch_spool is not None and cache_key is not None:
+        batch_spool.add(
+            cache_key,
+            model_type,
+            llm_model,
+            system_message,
+            user_message,
+            model,
+            temperature,
         )
-    else:
+        raise DeferredJob(f"Request {cache_key[:12]} spooled for batch processing.")
+
+    if model_type not in ("Anthropic", "OpenAI"):
         raise ValueError(f"Unsupported model type: {model_type}")
+    client = get_llm_client(model_type)
+    limiter = get_limiter(model_type)
+    expected_tokens = estimate_request_tokens(system_message, user_message)
 
+    if stream:
+        if not interactive:
+            limiter.acquire(expected_tokens)
+        stream_message = (
+            stream_anthropic_message
+            if model_type == "Anthropic"
+            else stream_openai_message
+        )
+        return stream_message(
+            client, system_message, user_message, llm_model, temperature
+        )
+
+    create_message = (
+        create_anthropic_message if model_type == "Anthropic" else create_openai_message
+    )
+    rate_limited, failed = 0, 0
+    while True:
+        if not interactive:
+            limiter.acquire(expected_tokens)
+        try:
+            with limiter.in_flight:
+                response = create_message(
+                    client, system_message, user_message, model, llm_model, temperature
+                )
+            if not interactive:
+                limiter.success()
+            break
+        except RATE_LIMIT_ERRORS:
+            if interactive or rate_limited == RATE_LIMIT_RETRIES:
+                raise
+            rate_limited += 1
+            delay = limiter.backoff()
+            print(f"Rate limited by {model_type}; pausing calls for {delay:.1f}s.")
+        except TRANSIENT_ERRORS:
+            if failed == TRANSIENT_RETRIES:
+                raise
+            failed += 1
+            time.sleep(2 ** (failed - 1))
+
+    if cache_key is not None:
+        response_cache.put(cache_key, llm_model, response)
     return response
 
 
+def validation_retries(attempts: int) -> Retrying:
+    """Instructor retry policy that only re-asks on invalid outputs; API errors
+    surface immediately to the rate-limit handling of `run_instructor_query`."""
+    return Retrying(
+        stop=stop_after_attempt(attempts),
+        retry=retry_if_exception_type((ValidationError, json.JSONDecodeError)),
+        reraise=True,
+    )
+
+
 def create_anthropic_message(
     client, system_message, user_message, model, llm_model, temperature
 ):
@@ -46,10 +336,10 @@ def create_anthropic_message(
         )
         answer = response.content[0].text.strip()
     else:
-        client = instructor.from_anthropic(client)
+        client = get_instructor_client(client)
         response = client.messages.create(
             max_tokens=4096,
-            max_retries=3,
+            max_retries=validation_retries(3),
             model=llm_model,
             temperature=temperature,
             system=system_message,
@@ -77,7 +367,7 @@ def create_openai_message(
         )
         answer = response.choices[0].message.content.strip()
     else:
-        client = instructor.from_openai(client)
+        client = get_instructor_client(client)
         response = client.chat.completions.create(
             model=llm_model,
             temperature=temperature,
@@ -89,3 +379,36 @@ def create_openai_message(
         )
         answer = response
     return answer
+
+
+def stream_anthropic_message(
+    client, system_message, user_message, llm_model, temperature
+):
+    """Stream a plain text message with the Anthropic client, yielding text chunks."""
+    with client.messages.stream(
+        max_tokens=4096,
+        model=llm_model,
+        system=system_message,
+        temperature=temperature,
+        messages=[
+            {"role": "user", "content": user_message},
+        ],
+    ) as stream:
+        for text in stream.text_stream:
+            yield text
+
+
+def stream_openai_message(client, system_message, user_message, llm_model, temperature):
+    """Stream a plain text message with the OpenAI client, yielding text chunks."""
+    response = client.chat.completions.create(
+        model=llm_model,
+        temperature=temperature,
+        messages=[
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ],
+        stream=True,
+    )
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
@@ -242,9 +242,10 @@ def create_paper_card(paper: Dict, mode="closed", name=""):
             key=f"chat_{paper_code}{name}",
         )
         if st.button("Send", key=f"send_{paper_code}{name}"):
-            response = au.interrogate_paper(paper_question, paper_code)
+            response = st.write_stream(
+                au.interrogate_paper(paper_question, paper_code, stream=True)
+            )
             db.log_qna_db(f"[{paper_code}] ::: {paper_question}", response)
-            st.write(response)
 
     # if not pd.isna(paper["repo_url"]):
     #     with st.expander("🔗 **Repositories & Libraries**", expanded=False):
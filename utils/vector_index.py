@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+import threading
+import json
+import time
+import os
+
+import utils.db as db
+
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", "data/abstract_index")
+
+
+class AbstractVectorIndex:
+    """Local approximate nearest-neighbour index (IVF) over a pgvector collection.
+
+    Vectors are kept L2-normalized in a memory-mapped float32 matrix on disk,
+    partitioned into `sqrt(n)` k-means lists. A search scores only the `n_probe`
+    lists closest to the query, after applying any metadata filters as a row
+    mask. The index is synced incrementally by arxiv_code at most every
+    `sync_interval` seconds, and re-partitioned when it has doubled in size.
+    Syncs run in a background thread and swap the new state in when done, so
+    searches are always served from the last built index."""
+
+    def __init__(
+        self,
+        collection_name: str = "arxiv_abstracts",
+        path: str = VECTOR_INDEX_PATH,
+        n_probe: int = 8,
+        sync_interval: int = 600,
+    ):
+        self.collection_name = collection_name
+        self.path = path
+        self.n_probe = n_probe
+        self.sync_interval = sync_interval
+        self.codes = []
+        self.vectors = None
+        self.centroids = None
+        self.assignments = None
+        self.trained_size = 0
+        self.metadata = None
+        self._last_sync = None
+        self._syncing = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.RLock()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether a built index is available to serve searches."""
+        return bool(self.codes) and self.metadata is not None
+
+    ###########
+    ## FILES ##
+    ###########
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def load(self) -> bool:
+        """Memory-map a previously saved index; returns False if none exists."""
+        if not os.path.exists(self._file("codes.json")):
+            return False
+        try:
+            with open(self._file("codes.json")) as f:
+                state = json.load(f)
+            vectors = np.load(self._file("vectors.npy"), mmap_mode="r")
+            assignments = np.load(self._file("assignments.npy"))
+            centroids = np.load(self._file("centroids.npy"))
+        except Exception as e:
+            print(f"Could not load local vector index: {e}")
+            return False
+        with self._lock:
+            self.vectors, self.assignments = vectors, assignments
+            self.centroids = centroids
+            self.codes = state["codes"]
+            self.trained_size = state["trained_size"]
+        return True
+
+    def _save(self, codes, vectors, centroids, assignments, trained_size) -> np.ndarray:
+        """Write an index state to disk; returns the memory-mapped vectors."""
+        os.makedirs(self.path, exist_ok=True)
+        arrays = {
+            "vectors.npy": vectors,
+            "assignments.npy": assignments,
+            "centroids.npy": centroids,
+        }
+        for name, array in arrays.items():
+            tmp_path = self._file(f"tmp_{name}")
+            np.save(tmp_path, np.ascontiguousarray(array))
+            os.replace(tmp_path, self._file(name))
+        tmp_path = self._file("codes.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"codes": codes, "trained_size": trained_size}, f)
+        os.replace(tmp_path, self._file("codes.json"))
+        return np.load(self._file("vectors.npy"), mmap_mode="r")
+
+    ##############
+    ## BUILDING ##
+    ##############
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def _train(self, vectors: np.ndarray, n_iter: int = 10, seed: int = 42):
+        """Spherical k-means over a set of vectors; returns (centroids, assignments)."""
+        n_rows = len(vectors)
+        n_lists = max(1, int(np.sqrt(n_rows)))
+        rng = np.random.default_rng(seed)
+        vectors = np.asarray(vectors)
+        centroids = vectors[rng.choice(n_rows, n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            for i in range(n_lists):
+                members = vectors[assignments == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+            centroids = self._normalize(centroids)
+        return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+    def sync(self):
+        """Add papers embedded since the last sync, drop deleted ones, and
+        refresh the filter metadata. The new state is built aside and swapped
+        in at the end; searches keep using the previous one meanwhile."""
+        with self._sync_lock:
+            with self._lock:
+                codes, vectors = self.codes, self.vectors
+                centroids, assignments = self.centroids, self.assignments
+                trained_size = self.trained_size
+
+            remote_codes = db.get_arxiv_id_embeddings(self.collection_name)
+            remote_set = set(remote_codes)
+            local_set = set(codes)
+            new_codes = [c for c in remote_codes if c not in local_set]
+            changed = False
+
+            if local_set - remote_set:
+                keep = np.array([c in remote_set for c in codes])
+                codes = [c for c, k in zip(codes, keep) if k]
+                vectors = np.asarray(vectors)[keep]
+                assignments = assignments[keep]
+                changed = True
+
+            if new_codes:
+                added_codes, added_vectors = db.get_collection_embeddings(
+                    self.collection_name, new_codes
+                )
+                if len(added_codes):
+                    added_vectors = self._normalize(added_vectors)
+                    if vectors is None or len(vectors) == 0:
+                        vectors = added_vectors
+                        assignments = np.empty(0, dtype=np.int64)
+                    else:
+                        vectors = np.vstack([np.asarray(vectors), added_vectors])
+                    codes = codes + added_codes
+                    if centroids is not None and len(centroids):
+                        added_assignments = np.argmax(
+                            added_vectors @ centroids.T, axis=1
+                        )
+                        assignments = np.concatenate([assignments, added_assignments])
+                    changed = True
+
+            if changed and len(codes):
+                if centroids is None or len(codes) >= 2 * trained_size:
+                    centroids, assignments = self._train(vectors)
+                    trained_size = len(codes)
+                vectors = self._save(
+                    codes, vectors, centroids, assignments, trained_size
+                )
+
+            metadata = db.get_search_metadata().reindex(codes)
+            with self._lock:
+                self.codes, self.vectors = codes, vectors
+                self.centroids, self.assignments = centroids, assignments
+                self.trained_size = trained_size
+                self.metadata = metadata
+                self._last_sync = time.monotonic()
+
+    def warmup(self):
+        """Load the saved index and sync it with the collection. Blocks; the app
+        runs it in a background thread at start."""
+        with self._sync_lock:
+            if self.vectors is None:
+                self.load()
+            self.sync()
+
+    def _background_sync(self):
+        try:
+            self.warmup()
+        except Exception as e:
+            print(f"Vector index sync failed, serving the last built index: {e}")
+            with self._lock:
+                self._last_sync = time.monotonic()
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def schedule_sync(self):
+        """Start a background sync if the index is stale and none is running."""
+        with self._lock:
+            if self._syncing or (
+                self._last_sync is not None
+                and time.monotonic() - self._last_sync < self.sync_interval
+            ):
+                return
+            self._syncing = True
+        threading.Thread(target=self._background_sync, daemon=True).start()
+
+    ###############
+    ## SEARCHING ##
+    ###############
+
+    @staticmethod
+    def _filter_mask(metadata: pd.DataFrame, filters: dict) -> np.ndarray:
+        """Row mask for title / date / citation filters (SearchCriteria fields)."""
+        mask = metadata["published"].notna().values
+        if filters.get("title"):
+            mask &= (
+                metadata["title"]
+                .str.contains(filters["title"], case=False, regex=False)
+                .fillna(False)
+                .values
+            )
+        if filters.get("min_publication_date"):
+            min_date = pd.to_datetime(filters["min_publication_date"])
+            mask &= (metadata["published"] >= min_date).values
+        if filters.get("max_publication_date"):
+            max_date = pd.to_datetime(filters["max_publication_date"])
+            mask &= (metadata["published"] <= max_date).values
+        if filters.get("min_citations") is not None:
+            mask &= (metadata["citation_count"] > filters["min_citations"]).values
+        return mask
+
+    def search(self, query_vector: list, k: int = 20, filters: dict = None) -> list:
+        """Return up to k (arxiv_code, cosine_distance) pairs, closest first."""
+        self.schedule_sync()
+        with self._lock:
+            codes, vectors = self.codes, self.vectors
+            centroids, assignments = self.centroids, self.assignments
+            metadata = self.metadata
+        if not codes or metadata is None:
+            return []
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+        mask = self._filter_mask(metadata, filters or {})
+
+        n_probe = min(self.n_probe, len(centroids))
+        probe_lists = np.argsort(-(centroids @ query))[:n_probe]
+        candidates = np.flatnonzero(np.isin(assignments, probe_lists) & mask)
+        if len(candidates) < k:
+            ## Heavy filtering; fall back to an exact scan of matching rows.
+            candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        distances = 1 - vectors[candidates] @ query
+        top = np.argsort(distances)[:k]
+        return [(codes[candidates[i]], float(distances[i])) for i in top]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(collection_name: str = "arxiv_abstracts") -> AbstractVectorIndex:
+    """Process-wide index instance per collection."""
+    with _indexes_lock:
+        if collection_name not in _indexes:
+            _indexes[collection_name] = AbstractVectorIndex(
+                collection_name, path=os.path.join(VECTOR_INDEX_PATH, collection_name)
+            )
+        return _indexes[collection_name]
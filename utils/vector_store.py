@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import time
 import os
+import re
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from mlx_lm import generate
 import tiktoken
 
@@ -29,9 +31,71 @@ def validate_openai_env():
 ## SUMMARIZATION ##
 ###################
 
-text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-    chunk_size=2000, chunk_overlap=50
-)
+## Chunking budget (tokens) for summarization levels.
+CHUNK_TOKENS = 2000
+CHUNK_OVERLAP = 50
+
+## Concurrent chunk summaries per level (API models only; MLX runs in sequence).
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", 8))
+CHUNK_RETRIES = 2
+
+
+def count_tokens(text: str) -> int:
+    return len(token_encoder.encode(text, disallowed_special=()))
+
+
+def tokenize_pieces(document: str, max_piece_tokens=CHUNK_TOKENS) -> list:
+    """Split a document into (text, n_tokens) pieces, encoding each piece once.
+    Pieces are paragraphs (long ones split by line); any piece still over
+    `max_piece_tokens` is sliced on token boundaries. Pieces keep their
+    separators, so joining them restores the document."""
+    pieces = []
+    for paragraph in re.split(r"(?<=\n\n)", document):
+        if not paragraph:
+            continue
+        parts = (
+            re.split(r"(?<=\n)", paragraph)
+            if len(paragraph) > 4 * max_piece_tokens
+            else [paragraph]
+        )
+        for part in parts:
+            if not part:
+                continue
+            token_ids = token_encoder.encode(part, disallowed_special=())
+            if len(token_ids) <= max_piece_tokens:
+                pieces.append((part, len(token_ids)))
+                continue
+            for st_idx in range(0, len(token_ids), max_piece_tokens):
+                sliced = token_ids[st_idx : st_idx + max_piece_tokens]
+                pieces.append((token_encoder.decode(sliced), len(sliced)))
+    return pieces
+
+
+def pack_chunks(
+    pieces: list, chunk_size=CHUNK_TOKENS, chunk_overlap=CHUNK_OVERLAP
+) -> list:
+    """Greedily pack (text, n_tokens) pieces into chunks of at most `chunk_size`
+    tokens, carrying trailing pieces of up to `chunk_overlap` tokens into the
+    next chunk. Counts are summed, never re-encoded."""
+    chunks = []
+    current, current_tokens = [], 0
+    for text, n_tokens in pieces:
+        if current and current_tokens + n_tokens > chunk_size:
+            chunks.append(("".join(t for t, _ in current), current_tokens))
+            overlap, overlap_tokens = [], 0
+            for piece in reversed(current):
+                if overlap_tokens + piece[1] > chunk_overlap:
+                    break
+                overlap.insert(0, piece)
+                overlap_tokens += piece[1]
+            if overlap_tokens + n_tokens > chunk_size:
+                overlap, overlap_tokens = [], 0
+            current, current_tokens = overlap, overlap_tokens
+        current.append((text, n_tokens))
+        current_tokens += n_tokens
+    if current:
+        chunks.append(("".join(t for t, _ in current), current_tokens))
+    return chunks
 
 
 def recursive_summarize_by_parts(
@@ -42,14 +106,28 @@ def recursive_summarize_by_parts(
     mlx_model=None,
     mlx_tokenizer=None,
     verbose=False,
+    max_workers=SUMMARY_MAX_WORKERS,
+    return_stats=False,
 ):
-    """Recursively apply the summarize_by_segments function to a document."""
-    ori_token_count = len(token_encoder.encode(document))
+    """Recursively apply the summarize_by_segments function to a document.
+    Token counts are carried per piece (the document and each chunk summary are
+    encoded once). With `return_stats`, also returns per-level wall time, chunk
+    and token counts; level 0 holds the source document's token count."""
+    pieces = tokenize_pieces(document)
+    ori_token_count = sum(n for _, n in pieces)
     token_count = ori_token_count + 0
     if verbose:
         print(f"Starting tokens: {ori_token_count}")
     summaries_dict = {}
     token_dict = {}
+    level_stats = {
+        0: {
+            "seconds": 0.0,
+            "chunks": 0,
+            "input_tokens": ori_token_count,
+            "output_tokens": ori_token_count,
+        }
+    }
     retry_once = True
     i = 1
 
@@ -57,12 +135,29 @@ def recursive_summarize_by_parts(
         if verbose:
             print("------------------------")
             print(f"Summarization iteration {i}...")
-        document = summarize_by_parts(
-            paper_title, document, model, mlx_model, mlx_tokenizer, verbose
+        st_time = time.monotonic()
+        chunk_stats = {}
+        pieces = summarize_pieces(
+            paper_title,
+            pieces,
+            model,
+            mlx_model,
+            mlx_tokenizer,
+            verbose,
+            max_workers=max_workers,
+            stats=chunk_stats,
         )
-
-        token_diff = token_count - len(token_encoder.encode(document))
-        token_count = len(token_encoder.encode(document))
+        document = "".join(text for text, _ in pieces)
+
+        new_token_count = sum(n for _, n in pieces)
+        token_diff = token_count - new_token_count
+        level_stats[i] = {
+            "seconds": round(time.monotonic() - st_time, 2),
+            "chunks": chunk_stats.get("chunks"),
+            "input_tokens": token_count,
+            "output_tokens": new_token_count,
+        }
+        token_count = new_token_count
         frac = token_count / ori_token_count
         summaries_dict[i] = document
         token_dict[i] = token_count
@@ -70,6 +165,7 @@ def recursive_summarize_by_parts(
         if verbose:
             print(f"Total tokens: {token_count}")
             print(f"Compression: {frac:.2f}")
+            print(f"Level stats: {level_stats[i - 1]}")
 
         if token_diff < 50:
             if retry_once:
@@ -80,31 +176,70 @@ def recursive_summarize_by_parts(
                     print("Cannot compress further. Stopping.")
                 break
 
+    if return_stats:
+        return summaries_dict, token_dict, level_stats
     return summaries_dict, token_dict
 
 
-def summarize_by_parts(
+def summarize_chunk_with_retry(paper_title: str, chunk: str, model: str) -> str:
+    """Summarize one chunk, retrying transient failures."""
+    for attempt in range(CHUNK_RETRIES + 1):
+        try:
+            return summarize_doc_chunk(paper_title, chunk, model)
+        except Exception as e:
+            if attempt == CHUNK_RETRIES:
+                raise
+            print(f"Chunk summary failed ({e}), retrying...")
+            time.sleep(2**attempt)
+
+
+def summarize_pieces(
     paper_title: str,
-    document: str,
+    pieces: list,
     model="mlx",
     mlx_model=None,
     mlx_tokenizer=None,
     verbose=False,
-):
-    """Summarize a paper by segments."""
-    doc_chunks = text_splitter.create_documents([document])
-    summary_notes = ""
+    max_workers=SUMMARY_MAX_WORKERS,
+    stats: dict = None,
+) -> list:
+    """Summarize (text, n_tokens) pieces chunk by chunk; returns one
+    (summary, n_tokens) piece per chunk, in order. API model chunks are
+    summarized concurrently (up to `max_workers` at a time)."""
+    doc_chunks = [text for text, _ in pack_chunks(pieces)]
     st_time = pd.Timestamp.now()
+    if stats is not None:
+        stats["chunks"] = len(doc_chunks)
+
+    def to_piece(summary: str) -> tuple:
+        summary = au.numbered_to_bullet_list(summary) + "\n"
+        return summary, count_tokens(summary)
+
+    if model != "mlx" and max_workers > 1 and len(doc_chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(doc_chunks))) as ex:
+            chunk_summaries = list(
+                ex.map(
+                    lambda chunk: summarize_chunk_with_retry(paper_title, chunk, model),
+                    doc_chunks,
+                )
+            )
+        if verbose:
+            time_elapsed = pd.Timestamp.now() - st_time
+            print(
+                f"{len(doc_chunks)} chunks: {time_elapsed.total_seconds():.2f} seconds"
+            )
+        return [to_piece(s) for s in chunk_summaries]
+
+    summary_pieces = []
     for idx, current_chunk in enumerate(doc_chunks):
-        summary_notes += (
-            au.numbered_to_bullet_list(
+        summary_pieces.append(
+            to_piece(
                 summarize_doc_chunk_mlx(
                     paper_title, current_chunk, mlx_model, mlx_tokenizer
                 )
                 if model == "mlx"
-                else summarize_doc_chunk(paper_title, current_chunk, model)
+                else summarize_chunk_with_retry(paper_title, current_chunk, model)
             )
-            + "\n"
         )
         if verbose:
             time_elapsed = pd.Timestamp.now() - st_time
@@ -113,7 +248,31 @@ def summarize_by_parts(
             )
             st_time = pd.Timestamp.now()
 
-    return summary_notes
+    return summary_pieces
+
+
+def summarize_by_parts(
+    paper_title: str,
+    document: str,
+    model="mlx",
+    mlx_model=None,
+    mlx_tokenizer=None,
+    verbose=False,
+    max_workers=SUMMARY_MAX_WORKERS,
+    stats: dict = None,
+):
+    """Summarize a paper by segments."""
+    summary_pieces = summarize_pieces(
+        paper_title,
+        tokenize_pieces(document),
+        model,
+        mlx_model,
+        mlx_tokenizer,
+        verbose,
+        max_workers=max_workers,
+        stats=stats,
+    )
+    return "".join(text for text, _ in summary_pieces)
 
 
 def summarize_doc_chunk(paper_title: str, document: str, model="local"):
@@ -29,6 +29,7 @@ run_step "11: Abstract Embedder" "workflow/l0_abstract_embedder.py"
 run_step "12: Page Extractor" "workflow/m0_page_extractor.py"
 run_step "13:  Repo Extractor" "workflow/n0_repo_extractor.py"
 run_step "14: GIST Updater" "workflow/z0_update_gist.py"
+run_step "15: Papers Snapshot" "workflow/z2_refresh_snapshot.py"
 #run_step "14: Generate tweet" "workflow/z1_generate_tweet.py"
 
 echo "Done! Please enjoy the rest of your day and spread love around your neighbourhood."
\ No newline at end of file
@@ -5,7 +5,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from langchain_community.callbacks import get_openai_callback
-from tqdm import tqdm
 
 sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
@@ -14,6 +13,7 @@ os.chdir(os.environ.get("PROJECT_PATH"))
 import utils.vector_store as vs
 import utils.paper_utils as pu
 import utils.db as db
+from utils.concurrency import run_concurrent
 
 
 def shorten_list(list_str: str):
@@ -27,21 +27,20 @@ def shorten_list(list_str: str):
 
 
 def main():
-    arxiv_codes = pu.get_local_arxiv_codes()
-    done_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    local_codes = pu.get_local_arxiv_codes()
+    arxiv_codes = db.pending_codes(
+        target_table="summary_notes", source_codes=local_codes, order="desc"
+    )
 
     # mlx_model, mlx_tokenizer = get_mlx_model()
 
-    for arxiv_code in tqdm(arxiv_codes):
+    def summarize(arxiv_code):
         paper_content = pu.load_local(arxiv_code, "arxiv_text", format="txt")
         paper_content = pu.preprocess_arxiv_doc(paper_content)
-        title_dict = db.get_arxiv_title_dict(db.db_params)
-        paper_title = title_dict.get(arxiv_code, None)
+        paper_title = db.get_arxiv_title(arxiv_code)
         if paper_title is None:
             print(f"Could not find '{arxiv_code}' in the meta-database. Skipping...")
-            continue
+            return None
 
         summaries_dict, token_dict = vs.recursive_summarize_by_parts(
             paper_title,
@@ -51,15 +50,19 @@ def main():
             verbose=False,
         )
 
-        ## Insert notes as code, level, summary & tokens,
+        ## Notes as code, level, summary & tokens,
         summary_notes = pd.DataFrame(
             summaries_dict.items(), columns=["level", "summary"]
         )
         summary_notes["tokens"] = summary_notes.level.map(token_dict)
         summary_notes["arxiv_code"] = arxiv_code
+        return summary_notes
+
+    def store(arxiv_code, summary_notes):
         summary_notes["tstp"] = pd.Timestamp.now()
         db.upload_df_to_db(summary_notes, "summary_notes", db.db_params)
 
+    run_concurrent(arxiv_codes, summarize, store, desc="Summarizing")
     print("Done!")
 
 
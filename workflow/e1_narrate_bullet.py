@@ -5,33 +5,34 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from langchain_community.callbacks import get_openai_callback
-from tqdm import tqdm
 
 sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
 
 import utils.vector_store as vs
 import utils.db as db
+from utils.concurrency import run_concurrent
 
 
 def main():
     vs.validate_openai_env()
 
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
     title_map = db.get_arxiv_title_dict(db.db_params)
-    done_codes = db.get_arxiv_id_list(db.db_params, "bullet_list_summaries")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1]
+    arxiv_codes = list(
+        db.pending_codes("summary_notes", "bullet_list_summaries", order="desc")
+    )
+    notes_map = db.get_extended_notes_batch(arxiv_codes, expected_tokens=500)
 
-    for arxiv_code in tqdm(arxiv_codes):
-        paper_notes = db.get_extended_notes(arxiv_code, expected_tokens=500)
+    def bulletize(arxiv_code):
+        paper_notes = notes_map[arxiv_code]
         paper_title = title_map[arxiv_code]
-
-        ## Insert copywriter's summary into the database.
         bullet_list = vs.convert_notes_to_bullets(paper_title, paper_notes, model="gpt-4o")
-        bullet_list = bullet_list.replace("\n\n", "\n")
-        db.insert_bullet_list_summary(arxiv_code, bullet_list)
+        return bullet_list.replace("\n\n", "\n")
 
+    ## Insert copywriter's summary into the database.
+    run_concurrent(
+        arxiv_codes, bulletize, db.insert_bullet_list_summary, desc="Bulleting"
+    )
     print("Done!")
 
 
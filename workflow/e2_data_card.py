@@ -4,26 +4,37 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from tqdm import tqdm
-
 PROJECT_PATH = os.environ.get("PROJECT_PATH")
 sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
 
 import utils.paper_utils as pu
 import utils.db as db
+from utils.concurrency import run_concurrent
 import utils.prompts as p
 from utils.instruct import run_instructor_query
 
 def main():
-    arxiv_codes = pu.get_local_arxiv_codes()
-    done_codes = db.get_arxiv_id_list(db.db_params, "arxiv_dashboards")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[::-1][:20]
-
-    for arxiv_code in tqdm(arxiv_codes):
-        title = db.get_arxiv_title_dict()[arxiv_code]
-        content = db.get_extended_notes(arxiv_code, expected_tokens=3000)
+    local_codes = pu.get_local_arxiv_codes()
+    arxiv_codes = list(
+        db.pending_codes(
+            target_table="arxiv_dashboards",
+            source_codes=local_codes,
+            order="desc",
+            limit=20,
+        )
+    )
+    notes_map = db.get_extended_notes_batch(arxiv_codes, expected_tokens=3000)
+
+    def create_data_card(arxiv_code):
+        title = db.get_arxiv_title(arxiv_code)
+        if title is None:
+            print(f"Could not find '{arxiv_code}' in the meta-database. Skipping...")
+            return None
+        content = notes_map.get(arxiv_code)
+        if content is None:
+            print(f"Could not find notes for '{arxiv_code}'. Skipping...")
+            return None
         res_str = run_instructor_query(
             p.DATA_CARD_SYSTEM_PROMPT,
             p.PDATA_CARD_USER_PROMPT.format(title=title, content=content),
@@ -33,8 +44,12 @@ def main():
         summary = res_str.split("<summary>")[1].split("</summary>")[0].strip()
         script = res_str.split("<script>")[1].split("</script>")[0].strip()
         scratchpad = ""
-        db.save_arxiv_dashboard_script(arxiv_code, summary, scratchpad, script)
+        return summary, scratchpad, script
+
+    def store(arxiv_code, data_card):
+        db.save_arxiv_dashboard_script(arxiv_code, *data_card)
 
+    run_concurrent(arxiv_codes, create_data_card, store, desc="Data cards")
     print("Done!")
 
 
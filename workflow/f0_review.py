@@ -7,13 +7,14 @@ sys.path.append(os.environ.get("PROJECT_PATH"))
 os.chdir(os.environ.get("PROJECT_PATH"))
 
 import pandas as pd
-from tqdm import tqdm
 import tiktoken
 
 from langchain_community.callbacks import get_openai_callback
 import utils.paper_utils as pu
 import utils.vector_store as vs
 import utils.db as db
+from utils.concurrency import run_concurrent
+from utils.batch import run_stage_in_batches
 
 token_encoder = tiktoken.encoding_for_model("gpt-3.5-turbo")
 LOCAL_PAPER_PATH = os.path.join(os.environ.get("PROJECT_PATH"), "data", "summaries")
@@ -25,29 +26,24 @@ def main():
     vs.validate_openai_env()
 
     ## Get paper list.
-    arxiv_codes = db.get_arxiv_id_list(pu.db_params, "summary_notes")
-    existing_papers = db.get_arxiv_id_list(pu.db_params, "summaries")
-    arxiv_codes = list(set(arxiv_codes) - set(existing_papers))
+    arxiv_codes = list(db.pending_codes("summary_notes", "summaries", order="desc"))
+    notes_map = db.get_extended_notes_batch(arxiv_codes, expected_tokens=2000)
 
-    arxiv_codes = sorted(arxiv_codes)[::-1]
-    for arxiv_code in tqdm(arxiv_codes):
-        new_content = db.get_extended_notes(arxiv_code, expected_tokens=2000)
+    def review(arxiv_code):
+        new_content = notes_map[arxiv_code]
 
         ## Try to run LLM process up to 3 times.
-        success = False
         for i in range(RETRIES):
             try:
-                summary = vs.review_llm_paper(new_content, model="gpt-4o")
-                success = True
-                break
+                return vs.review_llm_paper(new_content, model="gpt-4o")
             except Exception as e:
                 print(f"\nFailed to run LLM for '{arxiv_code}'. Attempt {i+1}/3.")
                 print(e)
                 continue
-        if not success:
-            print(f"Failed to run LLM for '{arxiv_code}'. Skipping...")
-            continue
+        print(f"Failed to run LLM for '{arxiv_code}'. Skipping...")
+        return None
 
+    def store(arxiv_code, summary):
         ## Extract and combine results.
         result_dict = summary.json()
         pu.store_local(result_dict, arxiv_code, "summaries")
@@ -67,8 +63,13 @@ def main():
         db.upload_to_db(flat_entries, pu.db_params, "summaries")
         # print(f"Added '{arxiv_code}' to summaries table.")
 
+    run_concurrent(arxiv_codes, review, store, desc="Reviewing")
     print("Done!")
 
 
 if __name__ == "__main__":
-    main()
+    ## `--batch` runs the stage through the offline batch provider.
+    if "--batch" in sys.argv:
+        run_stage_in_batches(main, "f0_review")
+    else:
+        main()
@@ -25,6 +25,7 @@ import nltk
 
 import utils.paper_utils as pu
 import utils.db as db
+from utils.instruct import get_llm_client
 
 db_params = pu.db_params
 
@@ -115,7 +116,7 @@ def create_topic_model(embedding_model: list, prompt: str) -> BERTopic:
     mmr_model = MaximalMarginalRelevance(diversity=0.3)
     openai.api_key = os.getenv("OPENAI_API_KEY")
     openai_model = OpenAI(
-        client=openai.OpenAI(),
+        client=get_llm_client("OpenAI"),
         model="gpt-4o",
         exponential_backoff=True,
         chat=True,
@@ -226,8 +227,7 @@ def main():
         topic_model = BERTopic.load("data/topic_model.pkl")
         reduced_model = pd.read_pickle("data/reduced_model.pkl")
 
-        done_codes = db.get_arxiv_id_list(db_params, "topics")
-        working_codes = list(set(arxiv_codes) - set(done_codes))
+        working_codes = list(db.pending_codes("summaries", "topics"))
         df = df[df["arxiv_code"].isin(working_codes)]
 
     df.set_index("arxiv_code", inplace=True)
@@ -30,10 +30,7 @@ PARENT_CHUNK_SIZE = 10000
 PARENT_CHUNK_OVERLAP = 1000
 VERSION_NAME = "10000_1000"
 
-version_name_map = {
-    "10000_1000": "arxiv_large_parent_chunks",
-    "2000_200": "arxiv_parent_chunks",
-}
+version_name_map = db.parent_chunk_tables
 
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=CHUNK_SIZE,
@@ -126,8 +123,9 @@ def main():
 
     ## Child chunks.
     print("Creating child chunks...")
-    child_done = db.get_arxiv_id_list(pu.db_params, "arxiv_chunks")
-    child_codes = list(set(local_codes) - set(child_done))
+    child_codes = list(
+        db.pending_codes(target_table="arxiv_chunks", source_codes=local_codes)
+    )
     print(f"Found {len(child_codes)} child papers pending.")
 
     for arxiv_code in tqdm(child_codes):
@@ -141,7 +139,12 @@ def main():
         doc_chunks_df["arxiv_code"] = arxiv_code
         doc_chunks_df["chunk_id"] = doc_chunks_df.index
         doc_chunks_df.columns = ["text", "arxiv_code", "chunk_id"]
-        db.upload_df_to_db(doc_chunks_df, "arxiv_chunks", pu.db_params)
+        db.upload_df_to_db(
+            doc_chunks_df,
+            "arxiv_chunks",
+            pu.db_params,
+            upsert_keys=["arxiv_code", "chunk_id"],
+        )
 
         ## Store document chunks in JSON.
         doc_chunks_list = doc_chunks_df.to_dict(orient="records")
@@ -150,8 +153,9 @@ def main():
     ## Parent chunks.
     print("Creating parent chunks...")
     parent_table_name = version_name_map[VERSION_NAME]
-    parent_done = db.get_arxiv_id_list(pu.db_params, parent_table_name)
-    parent_codes = list(set(local_codes) - set(parent_done))
+    parent_codes = list(
+        db.pending_codes(target_table=parent_table_name, source_codes=local_codes)
+    )
     print(f"Found {len(parent_codes)} parent papers pending.")
 
     for arxiv_code in tqdm(parent_codes):
@@ -166,7 +170,12 @@ def main():
         doc_chunks_df["arxiv_code"] = arxiv_code
         doc_chunks_df["chunk_id"] = doc_chunks_df.index
         doc_chunks_df.columns = ["text", "arxiv_code", "chunk_id"]
-        db.upload_df_to_db(doc_chunks_df, parent_table_name, pu.db_params)
+        db.upload_df_to_db(
+            doc_chunks_df,
+            parent_table_name,
+            pu.db_params,
+            upsert_keys=["arxiv_code", "chunk_id"],
+        )
 
         ## Store document chunks in JSON.
         doc_chunks_list = doc_chunks_df.to_dict(orient="records")
@@ -175,13 +184,19 @@ def main():
     ## Mapping of child-to-parent.
     print("Mapping child-to-parent...")
     ## ToDo: Allow version param here.
-    mapping_done = db.get_arxiv_id_list(pu.db_params, "arxiv_chunk_map")
-    mapping_codes = list(set(local_codes) - set(mapping_done))
+    mapping_codes = list(
+        db.pending_codes(target_table="arxiv_chunk_map", source_codes=local_codes)
+    )
     print(f"Found {len(mapping_codes)} mapping papers pending.")
 
     mapping_df = parallel_process_mapping(mapping_codes, child_path, parent_path)
     mapping_df["version"] = VERSION_NAME
-    db.upload_df_to_db(mapping_df, "arxiv_chunk_map", pu.db_params)
+    db.upload_df_to_db(
+        mapping_df,
+        "arxiv_chunk_map",
+        pu.db_params,
+        upsert_keys=["arxiv_code", "version", "child_id"],
+    )
 
     # for arxiv_code in tqdm(mapping_codes):
     #     ## Open doc and meta_data.
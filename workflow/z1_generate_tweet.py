@@ -206,10 +206,9 @@ def main():
     tweet_type = "insight_v1"
 
     ## Define arxiv code.
-    arxiv_codes = db.get_arxiv_id_list(db.db_params, "summary_notes")
-    done_codes = db.get_arxiv_id_list(db.db_params, "tweet_reviews")
-    arxiv_codes = list(set(arxiv_codes) - set(done_codes))
-    arxiv_codes = sorted(arxiv_codes)[-50:]
+    arxiv_codes = list(
+        db.pending_codes("summary_notes", "tweet_reviews", order="desc", limit=50)
+    )
     citations_df = db.load_citations()
     citations_df = citations_df[citations_df.index.isin(arxiv_codes)]
 
@@ -261,8 +260,7 @@ def main():
     publish_date = paper_details["published"][0].strftime("%B %Y")
     publish_date_full = paper_details["published"][0].strftime("%B %d, %Y")
     author = paper_details["authors"][0]
-    title_map = db.get_arxiv_title_dict()
-    paper_title = title_map[arxiv_code]
+    paper_title = db.get_arxiv_title(arxiv_code)
 
     tweet_facts = (
         f"```**Title: {paper_title}**\n**Authors: {author}**\n{paper_summary}```"
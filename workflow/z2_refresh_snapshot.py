@@ -0,0 +1,17 @@
+import sys, os
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.environ.get("PROJECT_PATH"))
+
+import utils.db as db
+
+
+def main():
+    """Rebuild the denormalized papers snapshot read by the app."""
+    db.refresh_papers_snapshot()
+    print("Done!")
+
+
+if __name__ == "__main__":
+    main()